@@ -1,30 +1,103 @@
 # modules/antispam.py
 from __future__ import annotations
+import copy
+import os
 import re
+import threading
 import time
+from collections import OrderedDict
 from datetime import timedelta
 from typing import Tuple, Optional
 
-from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
+from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton, ChatPermissions
 from telebot.apihelper import ApiTelegramException
 
-from state import GROUP_SETTINGS, PENDING_INPUT
+from state import GROUP_SETTINGS
 from utils import is_user_admin
+from outbound import SyncOutbound
+from antispam_policy import Penalty, Policy, Rule, compile_policy
+from antispam_actions import ActionPipeline
+from antispam_admins import AdminRoster
+from antispam_dupes import WaveDetector
+from antispam_expiry import ExpiryScheduler
+from antispam_warns import WarnLedger
+from antispam_pending import PendingInputs
+from antispam_router import Router
+from antispam_scan import URL, scan_message, tg_links_hit
+from antispam_store import ConfigStore, WriteBehind
+
+# ------------- Outbound calls -------------
+# every Bot API call from the menus goes through one rate-limited, flood-wait aware sender
+_OUT = SyncOutbound()
+
+def _answer(bot, callback_id, text=None):
+    return _OUT.call(bot.answer_callback_query, callback_id, text)
+
+def _send(bot, chat_id, text, **kwargs):
+    return _OUT.call(bot.send_message, chat_id, text, _chat=chat_id, **kwargs)
+
+def _reply(bot, m, text, **kwargs):
+    return _OUT.call(bot.reply_to, m, text, _chat=m.chat.id, **kwargs)
+
+# moderation calls (deletes, restrictions) aren't paced by the per-chat bucket: it models Telegram's
+# limit on messages *sent* to a chat, and spam should vanish without queueing behind the bot's own
+# replies. They still get a per-chat key of their own, so a flood wait only backs off that chat.
+def _moderate(fn, chat_id, *args, **kwargs):
+    return _OUT.call(fn, chat_id, *args, _chat=("mod", chat_id), _paced=False, **kwargs)
+
+def _delete(bot, chat_id, msg_id):
+    _forget_edit((chat_id, msg_id))
+    return _moderate(bot.delete_message, chat_id, msg_id)
 
 # ------------- Safe edit wrapper -------------
-def _safe_edit_text(bot, *args, **kwargs):
+# what each menu message we edited currently shows, so re-sending the same screen is skipped locally.
+# Other modules edit the same messages too, so entry-point screens pass force=True: they always go
+# out (Telegram's "message is not modified" still catches real no-ops) and start a fresh record.
+_LAST_EDIT: "OrderedDict[tuple, int]" = OrderedDict()
+_LAST_EDIT_MAX = 50_000
+_EDIT_LOCK = threading.Lock()
+
+def _digest(text, kwargs) -> int:
+    kb = kwargs.get("reply_markup")
+    return hash((text, kb.to_json() if kb is not None else None, kwargs.get("parse_mode")))
+
+def _safe_edit_text(bot, text, chat_id, message_id, digest=None, force=False, **kwargs):
+    key = (chat_id, message_id)
+    if digest is None:
+        digest = _digest(text, kwargs)
+    with _EDIT_LOCK:
+        if not force and _LAST_EDIT.get(key) == digest:
+            return
+        _LAST_EDIT[key] = digest
+        _LAST_EDIT.move_to_end(key)
+        if len(_LAST_EDIT) > _LAST_EDIT_MAX:
+            _LAST_EDIT.popitem(last=False)
+    # a newer edit of the same message supersedes this one while it waits for its turn
     try:
-        return bot.edit_message_text(*args, **kwargs)
+        return _OUT.call(bot.edit_message_text, text, chat_id, message_id,
+                         _chat=chat_id, _collapse=key, **kwargs)
     except ApiTelegramException as e:
         if 'message is not modified' in str(e).lower():
             return
+        _forget_edit(key, digest)
         raise
     except Exception as e:
         if 'message is not modified' in str(e).lower():
             return
+        _forget_edit(key, digest)
         raise
 
+def _forget_edit(key, digest=None):
+    with _EDIT_LOCK:
+        if digest is None or _LAST_EDIT.get(key) == digest:
+            _LAST_EDIT.pop(key, None)
+
 # ------------- Defaults / persist -------------
+# menu clicks only touch memory; GROUP_SETTINGS gets the changed groups in batches
+# (the flusher thread is started in register())
+SETTINGS_FLUSH = WriteBehind(GROUP_SETTINGS, "antispam_cfg")
+STORE = ConfigStore(GROUP_SETTINGS, "antispam_cfg", write_behind=SETTINGS_FLUSH)
+
 DEFAULT_ANTISPAM = {
     "enabled": True,
 
@@ -49,10 +122,10 @@ DEFAULT_ANTISPAM = {
         "bots":     {"penalty":"off","delete":False,"mute_secs":30*60,"warn_secs":30*60,"ban_secs":30*60},
     },
 
-    # Total links block submenu
+    # Total links block submenu; deleting is opt-in now that messages are actually scanned
     "total_links": {
         "penalty": "off",             # off|warn|kick|mute|ban
-        "delete": True,
+        "delete": False,
         "mute_secs": 30*60,
         "warn_secs": 30*60,
         "ban_secs":  30*60
@@ -66,27 +139,37 @@ DEFAULT_ANTISPAM = {
         "groups":   {"penalty":"off","delete":False,"mute_secs":30*60,"warn_secs":30*60,"ban_secs":30*60},
         "users":    {"penalty":"off","delete":False,"mute_secs":30*60,"warn_secs":30*60,"ban_secs":30*60},
         "bots":     {"penalty":"off","delete":False,"mute_secs":30*60,"warn_secs":30*60,"ban_secs":30*60},
-    }
+    },
+
+    # Copy-paste waves submenu (same layout as Total links block); opt-in, so nothing is on by default
+    "dupes": {
+        "penalty": "off",             # off|warn|kick|mute|ban
+        "delete": False,
+        "mute_secs": 30*60,
+        "warn_secs": 30*60,
+        "ban_secs":  30*60
+    },
 }
 
-def _ensure_defaults(gid: int):
-    g = GROUP_SETTINGS[gid]
-    cfg = g.get("antispam_cfg")
+def _with_defaults(cfg: Optional[dict]) -> Tuple[dict, bool]:
+    """``cfg`` with missing keys filled in and old layouts migrated; never modifies ``cfg`` itself."""
     changed = False
+    # always deep-copy defaults: a shared nested dict would leak one group's edits into every group
     if not isinstance(cfg, dict):
-        cfg = DEFAULT_ANTISPAM.copy()
+        cfg = copy.deepcopy(DEFAULT_ANTISPAM)
         changed = True
     else:
+        cfg = dict(cfg)  # never patch the stored version in place
         for k, v in DEFAULT_ANTISPAM.items():
             if k not in cfg:
-                cfg[k] = v; changed = True
-        for sec in ("tg_links","forwarding","total_links","quote_block"):
+                cfg[k] = copy.deepcopy(v); changed = True
+        for sec in ("tg_links","forwarding","total_links","quote_block","dupes"):
             if sec not in cfg or not isinstance(cfg[sec], dict):
-                cfg[sec] = DEFAULT_ANTISPAM[sec].copy(); changed = True
+                cfg[sec] = copy.deepcopy(DEFAULT_ANTISPAM[sec]); changed = True
             else:
-                for k, v in DEFAULT_ANTISPAM[sec].items():
-                    if k not in cfg[sec]:
-                        cfg[sec][k] = v; changed = True
+                missing = {k: v for k, v in DEFAULT_ANTISPAM[sec].items() if k not in cfg[sec]}
+                if missing:
+                    cfg[sec] = {**cfg[sec], **copy.deepcopy(missing)}; changed = True
 
     # migrate old forwarding booleans -> new per-scope dict
     fwd = cfg.get("forwarding", {})
@@ -101,18 +184,150 @@ def _ensure_defaults(gid: int):
         }
         changed = True
 
-    if changed:
-        g2 = dict(g); g2["antispam_cfg"] = cfg
-        GROUP_SETTINGS[gid] = g2
+    return cfg, changed
+
+def _ensure_defaults(gid: int):
+    STORE.ensure(gid, _with_defaults)
 
 def _mutate(gid: int, fn):
     _ensure_defaults(gid)
-    g = GROUP_SETTINGS[gid]
-    cfg = dict(g["antispam_cfg"])
-    fn(cfg)
-    g2 = dict(g); g2["antispam_cfg"] = cfg
-    GROUP_SETTINGS[gid] = g2
-    return cfg
+    # only the sections fn touches are copied; the store bumps the group's config version
+    return STORE.mutate(gid, fn)
+
+# ------------- Compiled policies -------------
+# per-message enforcement reads these instead of walking the nested config dicts;
+# cached as (config version, policy) and recompiled only after the version moves.
+# Read-only: a group nobody configured gets the defaults' policy without a record being written.
+_POLICIES: dict = {}
+
+def policy(gid: int) -> Policy:
+    hit = _POLICIES.get(gid)
+    v = STORE.version(gid)
+    if hit is not None and hit[0] == v:
+        return hit[1]
+    p = compile_policy(_with_defaults(STORE.find(gid))[0])
+    _POLICIES[gid] = (v, p)
+    return p
+
+# ------------- Pending inputs -------------
+# duration prompts waiting for the admin's next message; forgotten after PROMPT_TTL seconds
+PROMPT_TTL = 10 * 60
+PENDING = PendingInputs(ttl=PROMPT_TTL)
+
+# ------------- Admin roster -------------
+# admin checks are a set lookup; the list is loaded once per group and kept current from chat_member updates
+ADMINS = AdminRoster(lambda bot, gid: _OUT.call(bot.get_chat_administrators, gid),
+                     fallback=is_user_admin)
+
+# ------------- Penalty expiry -------------
+# timed mutes / bans / warns lapse through a persistent scheduler (started in register())
+# set ANTISPAM_DB to a persistent volume in production; the default keeps it out of the working tree
+ANTISPAM_DB = os.environ.get("ANTISPAM_DB") or os.path.join(
+    os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share"),
+    "musicbot", "antispam.db")
+EXPIRY = ExpiryScheduler(ANTISPAM_DB)
+_UNRESTRICTED = ChatPermissions(can_send_messages=True, can_send_media_messages=True, can_send_polls=True,
+                                can_send_other_messages=True, can_add_web_page_previews=True,
+                                can_invite_users=True)
+
+def schedule_expiry(gid: int, user_id: int, rule: Rule):
+    """Queue the lift of a penalty just applied under ``rule``; permanent ones are left alone."""
+    if rule.secs and rule.penalty in (Penalty.WARN, Penalty.MUTE, Penalty.BAN):
+        EXPIRY.schedule(gid, user_id, rule.penalty.name.lower(), rule.secs)
+
+# ------------- Warn ledger -------------
+WARNS = WarnLedger()
+WARN_COMPACT_EVERY = 10 * 60  # seconds between passes dropping users whose warns lapsed
+
+def apply_warn(gid: int, user_id: int, rule: Rule) -> Tuple[Penalty, int]:
+    """Count a warn under ``rule``; returns what to apply now: (WARN, secs) or, at the limit, the escalation."""
+    n = WARNS.warn(gid, user_id, rule.secs)
+    if rule.warn_limit and n >= rule.warn_limit:
+        WARNS.clear(gid, user_id)
+        EXPIRY.cancel(gid, user_id, "warn")
+        if rule.escalate in (Penalty.MUTE, Penalty.BAN) and rule.escalate_secs:
+            EXPIRY.schedule(gid, user_id, rule.escalate.name.lower(), rule.escalate_secs)
+        return rule.escalate, rule.escalate_secs
+    schedule_expiry(gid, user_id, rule)
+    return Penalty.WARN, rule.secs
+
+def _compact_warns():
+    WARNS.compact()
+    t = threading.Timer(WARN_COMPACT_EVERY, _compact_warns)
+    t.daemon = True
+    t.start()
+
+# ------------- Moderation actions -------------
+# deletes and penalties are queued per chat and sent in batches (handlers installed in register())
+ACTIONS = ActionPipeline()
+_MUTED = ChatPermissions(can_send_messages=False)
+
+def enforce(bot, m, rule: Rule):
+    """Apply ``rule`` to an offending message: queue its delete and the (possibly escalated) penalty."""
+    _enforce(bot, m.chat.id, m.from_user.id, m.message_id, rule)
+
+def _enforce(bot, gid: int, uid: int, message_id: int, rule: Rule):
+    if ADMINS.is_admin(bot, gid, uid):
+        return
+    if rule.delete:
+        ACTIONS.delete(gid, message_id)
+    if rule.penalty is Penalty.WARN:
+        penalty, secs = apply_warn(gid, uid, rule)
+    else:
+        penalty, secs = rule.penalty, rule.secs
+        schedule_expiry(gid, uid, rule)
+    ACTIONS.punish(gid, uid, penalty, secs)
+
+# ------------- Copy-paste waves -------------
+DUPES = WaveDetector()
+
+_GROUP_TYPES = ("group", "supergroup")
+_SCANNED_TYPES = ["text", "photo", "video", "document", "audio", "animation", "voice"]
+
+def check_wave(m) -> list:
+    """Fingerprint a group message; the (user_id, message_id) pairs of the wave it joins, if any.
+
+    Local work only (no Bot API calls), so it can run as a handler predicate;
+    admins are skipped when their group's roster is already loaded, and
+    enforcement re-checks every offender anyway.
+    """
+    if m.chat.type not in _GROUP_TYPES or m.from_user is None:
+        return []
+    p = policy(m.chat.id)
+    if not p.enabled or p.dupes is None:
+        return []
+    admins = ADMINS.admins(m.chat.id)
+    if admins is not None and m.from_user.id in admins:
+        return []
+    return DUPES.check(m.chat.id, m.from_user.id, m.message_id,
+                       m.text if m.text is not None else getattr(m, "caption", None))
+
+# ------------- Incoming messages -------------
+def link_rules(m) -> list:
+    """Rules of the link sections (Telegram links, Total links block) that a group message trips."""
+    if m.chat.type not in _GROUP_TYPES or m.from_user is None:
+        return []
+    p = policy(m.chat.id)
+    if not p.enabled or not (p.tg_links or p.total_links):
+        return []
+    admins = ADMINS.admins(m.chat.id)
+    if admins is not None and m.from_user.id in admins:
+        return []
+    mask = scan_message(m)
+    if not mask:
+        return []
+    rules = []
+    if p.tg_links and tg_links_hit(mask, p.username_antispam, p.bots_antispam):
+        rules.append(p.tg_links)
+    if p.total_links and mask & URL:
+        rules.append(p.total_links)
+    return rules
+
+def _claim_spam(m) -> bool:
+    """message_handler predicate: local checks only; the verdict rides on the message to the handler."""
+    m.antispam_rules = link_rules(m)
+    m.antispam_wave = check_wave(m)
+    return bool(m.antispam_rules or m.antispam_wave)
 
 # ------------- Common helpers -------------
 def _human_duration(seconds: int) -> str:
@@ -178,12 +393,13 @@ def _main_kb(gid: int) -> InlineKeyboardMarkup:
         InlineKeyboardButton("💬 Quote",      callback_data=f"as:quote:{gid}")
     )
     kb.add(InlineKeyboardButton("🔗 Total links block", callback_data=f"as:all:{gid}"))
+    kb.add(InlineKeyboardButton("🧬 Copy-paste waves", callback_data=f"as:dup:{gid}"))
     kb.add(InlineKeyboardButton("🔙 Back", callback_data=f"open:{gid}"))
     return kb
 
 # ------------- Telegram links submenu -------------
 def _tg_text(gid: int) -> str:
-    cfg = GROUP_SETTINGS[gid]["antispam_cfg"]["tg_links"]
+    cfg = STORE.get(gid)["tg_links"]
     pen = cfg["penalty"].capitalize()
     deltxt = "Yes ✅" if cfg["delete"] else "No ✖️"
     base = (
@@ -203,7 +419,7 @@ def _tg_text(gid: int) -> str:
     return base
 
 def _tg_kb(gid: int) -> InlineKeyboardMarkup:
-    sec = GROUP_SETTINGS[gid]["antispam_cfg"]["tg_links"]
+    sec = STORE.get(gid)["tg_links"]
     kb = InlineKeyboardMarkup(row_width=3)
     kb.add(
         InlineKeyboardButton("✖️ Off",  callback_data=f"as:tg:pen:{gid}:off"),
@@ -233,7 +449,7 @@ def _tg_kb(gid: int) -> InlineKeyboardMarkup:
     return kb
 
 def _tg_dur_prompt(gid: int, which: str) -> Tuple[str, InlineKeyboardMarkup]:
-    sec = GROUP_SETTINGS[gid]["antispam_cfg"]["tg_links"]
+    sec = STORE.get(gid)["tg_links"]
     cur = _human_duration(sec.get(f"{which}_secs", 1800))
     txt = (
         f"⏱ <b>Set {which} duration</b>\n\n"
@@ -258,7 +474,7 @@ def _pen_summary(sec: dict) -> str:
     return "Off"
 
 def _fwd_text(gid: int) -> str:
-    fwd = GROUP_SETTINGS[gid]["antispam_cfg"]["forwarding"]
+    fwd = STORE.get(gid)["forwarding"]
 
     def row(title: str, key: str) -> str:
         sec = fwd[key]
@@ -281,7 +497,7 @@ def _fwd_text(gid: int) -> str:
     )
 
 def _fwd_kb(gid: int) -> InlineKeyboardMarkup:
-    fwd = GROUP_SETTINGS[gid]["antispam_cfg"]["forwarding"]
+    fwd = STORE.get(gid)["forwarding"]
     sel = fwd.get("selected", "channels")
     expanded = fwd.get("expanded", False)
     sec = fwd[sel]
@@ -336,7 +552,7 @@ def _fwd_kb(gid: int) -> InlineKeyboardMarkup:
     return kb
 
 def _fwd_dur_prompt(gid: int, which: str, kind: str) -> Tuple[str, InlineKeyboardMarkup]:
-    sec = GROUP_SETTINGS[gid]["antispam_cfg"]["forwarding"][which]
+    sec = STORE.get(gid)["forwarding"][which]
     cur = _human_duration(sec.get(f"{kind}_secs", 1800))
     txt = (
         f"⏱ <b>Set {kind} duration</b>\n\n"
@@ -352,7 +568,7 @@ def _fwd_dur_prompt(gid: int, which: str, kind: str) -> Tuple[str, InlineKeyboar
 
 # ------------- Quote submenu (same UX as Forwarding) -------------
 def _quote_text(gid: int) -> str:
-    qt = GROUP_SETTINGS[gid]["antispam_cfg"]["quote_block"]
+    qt = STORE.get(gid)["quote_block"]
 
     def row(title: str, key: str) -> str:
         sec = qt[key]
@@ -373,7 +589,7 @@ def _quote_text(gid: int) -> str:
     )
 
 def _quote_kb(gid: int) -> InlineKeyboardMarkup:
-    qt = GROUP_SETTINGS[gid]["antispam_cfg"]["quote_block"]
+    qt = STORE.get(gid)["quote_block"]
     sel = qt.get("selected", "channels")
     expanded = qt.get("expanded", False)
     sec = qt[sel]
@@ -428,7 +644,7 @@ def _quote_kb(gid: int) -> InlineKeyboardMarkup:
     return kb
 
 def _quote_dur_prompt(gid: int, which: str, kind: str) -> Tuple[str, InlineKeyboardMarkup]:
-    sec = GROUP_SETTINGS[gid]["antispam_cfg"]["quote_block"][which]
+    sec = STORE.get(gid)["quote_block"][which]
     cur = _human_duration(sec.get(f"{kind}_secs", 1800))
     txt = (
         f"⏱ <b>Set {kind} duration</b>\n\n"
@@ -442,9 +658,20 @@ def _quote_dur_prompt(gid: int, which: str, kind: str) -> Tuple[str, InlineKeybo
     kb.add(InlineKeyboardButton("✖️ Cancel", callback_data=f"as:quote:durcancel:{gid}"))
     return txt, kb
 
-# ------------- Total links block submenu -------------
-def _all_text(gid: int) -> str:
-    sec = GROUP_SETTINGS[gid]["antispam_cfg"]["total_links"]
+# ------------- Single-rule submenus (Total links block, Copy-paste waves) -------------
+# callback code -> (config key, header)
+_SIMPLE = {
+    "all": ("total_links",
+            "🔗 <b>TOTAL LINKS BLOCK</b>\n"
+            "Choose the punishment for those who sends any kind of link."),
+    "dup": ("dupes",
+            "🧬 <b>COPY-PASTE WAVES</b>\n"
+            "Choose the punishment for those who post the same text as several other users at once."),
+}
+
+def _simple_text(gid: int, code: str) -> str:
+    key, header = _SIMPLE[code]
+    sec = STORE.get(gid)[key]
     pen = sec["penalty"].capitalize()
     deltxt = "Yes ✅" if sec["delete"] else "No ✖️"
 
@@ -457,8 +684,7 @@ def _all_text(gid: int) -> str:
         dur = _human_duration(sec.get("ban_secs", 1800))
 
     text = (
-        "🔗 <b>TOTAL LINKS BLOCK</b>\n"
-        "Choose the punishment for those who sends any kind of link.\n\n"
+        f"{header}\n\n"
         f"<b>Penalty:</b> {pen}"
     )
     if dur:
@@ -466,34 +692,34 @@ def _all_text(gid: int) -> str:
     text += f"\n<b>Deletion:</b> {deltxt}"
     return text
 
-def _all_kb(gid: int) -> InlineKeyboardMarkup:
-    sec = GROUP_SETTINGS[gid]["antispam_cfg"]["total_links"]
+def _simple_kb(gid: int, code: str) -> InlineKeyboardMarkup:
+    sec = STORE.get(gid)[_SIMPLE[code][0]]
     kb = InlineKeyboardMarkup(row_width=3)
     kb.add(
-        InlineKeyboardButton("✖️ Off",  callback_data=f"as:all:pen:{gid}:off"),
-        InlineKeyboardButton("❗ Warn", callback_data=f"as:all:pen:{gid}:warn"),
-        InlineKeyboardButton("❗ Kick", callback_data=f"as:all:pen:{gid}:kick"),
+        InlineKeyboardButton("✖️ Off",  callback_data=f"as:{code}:pen:{gid}:off"),
+        InlineKeyboardButton("❗ Warn", callback_data=f"as:{code}:pen:{gid}:warn"),
+        InlineKeyboardButton("❗ Kick", callback_data=f"as:{code}:pen:{gid}:kick"),
     )
     kb.add(
-        InlineKeyboardButton("🔇 Mute", callback_data=f"as:all:pen:{gid}:mute"),
-        InlineKeyboardButton("🚷 Ban",  callback_data=f"as:all:pen:{gid}:ban"),
+        InlineKeyboardButton("🔇 Mute", callback_data=f"as:{code}:pen:{gid}:mute"),
+        InlineKeyboardButton("🚷 Ban",  callback_data=f"as:{code}:pen:{gid}:ban"),
     )
 
     if sec["penalty"] == "mute":
-        kb.add(InlineKeyboardButton("🔇 ⏱ Set mute duration", callback_data=f"as:all:dur:{gid}:mute"))
+        kb.add(InlineKeyboardButton("🔇 ⏱ Set mute duration", callback_data=f"as:{code}:dur:{gid}:mute"))
     elif sec["penalty"] == "warn":
-        kb.add(InlineKeyboardButton("❗ ⏱ Set warn duration", callback_data=f"as:all:dur:{gid}:warn"))
+        kb.add(InlineKeyboardButton("❗ ⏱ Set warn duration", callback_data=f"as:{code}:dur:{gid}:warn"))
     elif sec["penalty"] == "ban":
-        kb.add(InlineKeyboardButton("🚷 ⏱ Set ban duration",  callback_data=f"as:all:dur:{gid}:ban"))
+        kb.add(InlineKeyboardButton("🚷 ⏱ Set ban duration",  callback_data=f"as:{code}:dur:{gid}:ban"))
 
     kb.add(InlineKeyboardButton(f"🗑 Delete Messages {'✅' if sec['delete'] else '✖️'}",
-                                callback_data=f"as:all:del:{gid}"))
+                                callback_data=f"as:{code}:del:{gid}"))
     kb.add(InlineKeyboardButton("🔙 Back", callback_data=f"as:back:{gid}"),
            InlineKeyboardButton("🌞 Exceptions", callback_data=f"as:noop:{gid}"))
     return kb
 
-def _all_dur_prompt(gid: int, which: str) -> Tuple[str, InlineKeyboardMarkup]:
-    sec = GROUP_SETTINGS[gid]["antispam_cfg"]["total_links"]
+def _simple_dur_prompt(gid: int, code: str, which: str) -> Tuple[str, InlineKeyboardMarkup]:
+    sec = STORE.get(gid)[_SIMPLE[code][0]]
     cur = _human_duration(sec.get(f"{which}_secs", 1800))
     txt = (
         f"⏱ <b>Set {which} duration</b>\n\n"
@@ -503,125 +729,293 @@ def _all_dur_prompt(gid: int, which: str) -> Tuple[str, InlineKeyboardMarkup]:
         f"<b>Current duration:</b> {cur}"
     )
     kb = InlineKeyboardMarkup(row_width=1)
-    kb.add(InlineKeyboardButton("0️⃣ Remove duration", callback_data=f"as:all:durset:{gid}:{which}:0"))
-    kb.add(InlineKeyboardButton("✖️ Cancel", callback_data=f"as:all:durcancel:{gid}"))
+    kb.add(InlineKeyboardButton("0️⃣ Remove duration", callback_data=f"as:{code}:durset:{gid}:{which}:0"))
+    kb.add(InlineKeyboardButton("✖️ Cancel", callback_data=f"as:{code}:durcancel:{gid}"))
     return txt, kb
 
+# ------------- Rendered menus -------------
+# (text, keyboard) per menu screen, memoized by (gid, view) and reused until the config version moves
+_VIEWS = {
+    "main":  (lambda gid: _main_text(), _main_kb),
+    "tg":    (_tg_text, _tg_kb),
+    "fwd":   (_fwd_text, _fwd_kb),
+    "quote": (_quote_text, _quote_kb),
+    "all":   (lambda gid: _simple_text(gid, "all"), lambda gid: _simple_kb(gid, "all")),
+    "dup":   (lambda gid: _simple_text(gid, "dup"), lambda gid: _simple_kb(gid, "dup")),
+}
+_RENDERED: dict = {}
+
+def _render(gid: int, view: str):
+    v = STORE.version(gid)
+    hit = _RENDERED.get((gid, view))
+    if hit is not None and hit[0] == v:
+        return hit[1:]
+    text_fn, kb_fn = _VIEWS[view]
+    text, kb = text_fn(gid), kb_fn(gid)
+    digest = _digest(text, {"reply_markup": kb})
+    _RENDERED[(gid, view)] = (v, text, kb, digest)
+    return text, kb, digest
+
+def _show(bot, c, gid: int, view: str, force: bool = False):
+    text, kb, digest = _render(gid, view)
+    return _safe_edit_text(bot, text, c.message.chat.id, c.message.message_id, digest=digest, force=force,
+                           reply_markup=kb)
+
 # ------------- Register hooks -------------
+def _register_simple(router: Router, bot, code: str):
+    """Callbacks and duration input of one single-rule submenu (as:<code>:...)."""
+    key = _SIMPLE[code][0]
+
+    @router.route(code)
+    @router.route(code, "ret")
+    def simple_open(c, cb):
+        gid = cb.gid
+        _ensure_defaults(gid)
+        _show(bot, c, gid, code)
+
+    @router.route(code, "pen")
+    def simple_pen_set(c, cb):
+        gid, (val,) = cb.gid, cb.args
+        if val not in ("off","warn","kick","mute","ban"): _answer(bot, c.id); return
+        _mutate(gid, lambda cfg: cfg[key].__setitem__("penalty", val))
+        _show(bot, c, gid, code)
+        _answer(bot, c.id, "Penalty set")
+
+    @router.route(code, "del")
+    def simple_del_toggle(c, cb):
+        gid = cb.gid
+        _mutate(gid, lambda cfg: cfg[key].__setitem__("delete", not cfg[key]["delete"]))
+        _show(bot, c, gid, code)
+        _answer(bot, c.id, "Updated")
+
+    @router.route(code, "dur")
+    def simple_dur_prompt(c, cb):
+        gid, (which,) = cb.gid, cb.args
+        if which not in ("mute","warn","ban"): _answer(bot, c.id); return
+        txt, kb = _simple_dur_prompt(gid, code, which)
+        PENDING.put(c.message.chat.id, c.from_user.id,
+                    {"await":f"as_{code}_dur", "gid":gid, "which":which,
+                     "reply_to":(c.message.chat.id, c.message.message_id)})
+        _safe_edit_text(bot, txt, c.message.chat.id, c.message.message_id, reply_markup=kb, parse_mode="HTML")
+
+    @router.route(code, "durset")
+    def simple_dur_set_zero(c, cb):
+        gid, (which, val) = cb.gid, cb.args
+        if which not in ("mute","warn","ban") or val != "0": _answer(bot, c.id); return
+        _mutate(gid, lambda cfg: cfg[key].__setitem__(f"{which}_secs", 0))
+        _show(bot, c, gid, code)
+        _answer(bot, c.id, "Removed")
+
+    @router.route(code, "durcancel")
+    def simple_dur_cancel(c, cb):
+        gid = cb.gid
+        _show(bot, c, gid, code)
+
+    @PENDING.on(f"as_{code}_dur")
+    def simple_duration_input(m, ctx):
+        gid, which = ctx["gid"], ctx["which"]
+        secs = _parse_duration_to_seconds(m.text or "")
+        if secs is None:
+            _reply(bot, m, "✖️ Invalid duration. Example: <code>30 minutes</code> / <code>2 hours</code>", parse_mode="HTML")
+            return
+
+        _mutate(gid, lambda cfg: cfg[key].__setitem__(f"{which}_secs", int(secs)))
+
+        chat_id, msg_id = ctx["reply_to"]
+        try: _delete(bot, chat_id, msg_id)
+        except Exception: pass
+
+        human = _human_duration(int(secs))
+        kb = InlineKeyboardMarkup(row_width=1)
+        kb.add(InlineKeyboardButton("🔙 Back", callback_data=f"as:{code}:ret:{gid}"))
+        _send(bot, chat_id, f"✅ Duration set to: {human}", reply_markup=kb)
+
+
 def register(bot):
+    router = Router()
+
+    # one callback_query_handler for every antispam button; the router picks the function
+    @bot.callback_query_handler(func=lambda c: router.handles(c.data))
+    def on_callback(c):
+        if not router.dispatch(c):
+            _answer(bot, c.id)  # stale or unknown button; stop the spinner
+
+    # timed penalties running out
+    @EXPIRY.on("mute")
+    def lift_mutes(batch):
+        for chat_id, user_id in batch:
+            _moderate(bot.restrict_chat_member, chat_id, user_id, permissions=_UNRESTRICTED, _bulk=True)
+
+    @EXPIRY.on("ban")
+    def lift_bans(batch):
+        for chat_id, user_id in batch:
+            _moderate(bot.unban_chat_member, chat_id, user_id, only_if_banned=True, _bulk=True)
+
+    @EXPIRY.on("warn")
+    def lapse_warns(batch):
+        for chat_id, user_id in batch:
+            if not WARNS.count(chat_id, user_id):
+                WARNS.clear(chat_id, user_id)
+
+    SETTINGS_FLUSH.start()
+    EXPIRY.start()
+    _compact_warns()
+
+    # batched moderation actions
+    @ACTIONS.on("delete")
+    def delete_batch(chat_id, ids):
+        if len(ids) > 1 and hasattr(bot, "delete_messages"):
+            _moderate(bot.delete_messages, chat_id, ids)
+        else:
+            for msg_id in ids:
+                _delete(bot, chat_id, msg_id)
+
+    @ACTIONS.on("punish")
+    def punish_user(chat_id, user_id, penalty, secs):
+        until = int(time.time()) + secs if secs else None
+        if penalty is Penalty.MUTE:
+            _moderate(bot.restrict_chat_member, chat_id, user_id, until_date=until, permissions=_MUTED)
+        elif penalty is Penalty.BAN:
+            _moderate(bot.ban_chat_member, chat_id, user_id, until_date=until)
+        elif penalty is Penalty.KICK:
+            _moderate(bot.ban_chat_member, chat_id, user_id)
+            _moderate(bot.unban_chat_member, chat_id, user_id, only_if_banned=True)
+
+    # promotions / demotions (needs "chat_member" in allowed_updates)
+    @bot.chat_member_handler()
+    def on_chat_member(u):
+        ADMINS.on_chat_member(u)
+
+    # one message_handler for every open duration prompt: a single (chat, user) lookup per message
+    @bot.message_handler(func=PENDING.waiting)
+    def on_pending_input(m):
+        PENDING.dispatch(m)
+
+    # links / usernames and copy-paste waves: the (local) checks run in the predicate, so only
+    # offending messages are claimed here and everything else still reaches other modules' handlers
+    @bot.message_handler(func=_claim_spam, content_types=_SCANNED_TYPES)
+    def on_spam(m):
+        for rule in m.antispam_rules:
+            enforce(bot, m, rule)
+        if m.antispam_wave:
+            rule = policy(m.chat.id).dupes
+            if rule is None:
+                return  # switched off in between
+            for uid, msg_id in m.antispam_wave:
+                _enforce(bot, m.chat.id, uid, msg_id, rule)
+
     # main open
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("menu:antispam:"))
-    def open_main(c):
-        gid = int(c.data.split(":")[2])
-        if not is_user_admin(bot, gid, c.from_user.id):
-            bot.answer_callback_query(c.id, "Not admin."); return
+    @router.route("main")
+    def open_main(c, cb):
+        gid = cb.gid
+        if not ADMINS.is_admin(bot, gid, c.from_user.id):
+            _answer(bot, c.id, "Not admin."); return
         _ensure_defaults(gid)
-        _safe_edit_text(bot, _main_text(), c.message.chat.id, c.message.message_id, reply_markup=_main_kb(gid))
+        _show(bot, c, gid, "main", force=True)  # entered from outside; the message may show anything
 
     # back to main
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:back:"))
-    def back_main(c):
-        gid = int(c.data.split(":")[2])
-        _safe_edit_text(bot, _main_text(), c.message.chat.id, c.message.message_id, reply_markup=_main_kb(gid))
+    @router.route("back")
+    def back_main(c, cb):
+        gid = cb.gid
+        _show(bot, c, gid, "main")
 
     # -------- Telegram links --------
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:tg:") and c.data.split(":")[2] not in ("del","uname","bots","pen","dur","durset","durcancel","ret"))
-    def tg_open(c):
-        gid = int(c.data.split(":")[2])
+    @router.route("tg")
+    def tg_open(c, cb):
+        gid = cb.gid
         _ensure_defaults(gid)
-        _safe_edit_text(bot, _tg_text(gid), c.message.chat.id, c.message.message_id, reply_markup=_tg_kb(gid))
+        _show(bot, c, gid, "tg")
 
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:tg:pen:"))
-    def tg_pen_set(c):
-        _, _, _, gid, val = c.data.split(":"); gid = int(gid)
-        if val not in ("off","warn","kick","mute","ban"): bot.answer_callback_query(c.id); return
+    @router.route("tg", "pen")
+    def tg_pen_set(c, cb):
+        gid, (val,) = cb.gid, cb.args
+        if val not in ("off","warn","kick","mute","ban"): _answer(bot, c.id); return
         _mutate(gid, lambda cfg: cfg["tg_links"].__setitem__("penalty", val))
-        _safe_edit_text(bot, _tg_text(gid), c.message.chat.id, c.message.message_id, reply_markup=_tg_kb(gid))
-        bot.answer_callback_query(c.id, "Penalty set")
+        _show(bot, c, gid, "tg")
+        _answer(bot, c.id, "Penalty set")
 
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:tg:del:"))
-    def tg_del_toggle(c):
-        _, _, _, gid = c.data.split(":"); gid = int(gid)
+    @router.route("tg", "del")
+    def tg_del_toggle(c, cb):
+        gid = cb.gid
         _mutate(gid, lambda cfg: cfg["tg_links"].__setitem__("delete", not cfg["tg_links"]["delete"]))
-        _safe_edit_text(bot, _tg_text(gid), c.message.chat.id, c.message.message_id, reply_markup=_tg_kb(gid))
-        bot.answer_callback_query(c.id, "Updated")
+        _show(bot, c, gid, "tg")
+        _answer(bot, c.id, "Updated")
 
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:tg:uname:"))
-    def tg_uname_toggle(c):
-        _, _, _, gid = c.data.split(":"); gid = int(gid)
+    @router.route("tg", "uname")
+    def tg_uname_toggle(c, cb):
+        gid = cb.gid
         _mutate(gid, lambda cfg: cfg["tg_links"].__setitem__("username_antispam",
                                                              not cfg["tg_links"]["username_antispam"]))
-        _safe_edit_text(bot, _tg_text(gid), c.message.chat.id, c.message.message_id, reply_markup=_tg_kb(gid))
-        bot.answer_callback_query(c.id, "Updated")
+        _show(bot, c, gid, "tg")
+        _answer(bot, c.id, "Updated")
 
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:tg:bots:"))
-    def tg_bots_toggle(c):
-        _, _, _, gid = c.data.split(":"); gid = int(gid)
+    @router.route("tg", "bots")
+    def tg_bots_toggle(c, cb):
+        gid = cb.gid
         _mutate(gid, lambda cfg: cfg["tg_links"].__setitem__("bots_antispam",
                                                              not cfg["tg_links"]["bots_antispam"]))
-        _safe_edit_text(bot, _tg_text(gid), c.message.chat.id, c.message.message_id, reply_markup=_tg_kb(gid))
-        bot.answer_callback_query(c.id, "Updated")
+        _show(bot, c, gid, "tg")
+        _answer(bot, c.id, "Updated")
 
     # TG duration prompt
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:tg:dur:"))
-    def tg_dur_prompt(c):
-        _, _, _, gid, which = c.data.split(":"); gid = int(gid)
-        if which not in ("mute","warn","ban"): bot.answer_callback_query(c.id); return
+    @router.route("tg", "dur")
+    def tg_dur_prompt(c, cb):
+        gid, (which,) = cb.gid, cb.args
+        if which not in ("mute","warn","ban"): _answer(bot, c.id); return
         txt, kb = _tg_dur_prompt(gid, which)
-        PENDING_INPUT[c.from_user.id] = {"await":"as_tg_dur", "gid":gid, "which":which,
-                                         "reply_to":(c.message.chat.id, c.message.message_id)}
+        PENDING.put(c.message.chat.id, c.from_user.id,
+                    {"await":"as_tg_dur", "gid":gid, "which":which,
+                     "reply_to":(c.message.chat.id, c.message.message_id)})
         _safe_edit_text(bot, txt, c.message.chat.id, c.message.message_id, reply_markup=kb, parse_mode="HTML")
 
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:tg:durset:"))
-    def tg_dur_zero(c):
-        _, _, _, gid, which, val = c.data.split(":"); gid = int(gid)
-        if which not in ("mute","warn","ban") or val != "0": bot.answer_callback_query(c.id); return
+    @router.route("tg", "durset")
+    def tg_dur_zero(c, cb):
+        gid, (which, val) = cb.gid, cb.args
+        if which not in ("mute","warn","ban") or val != "0": _answer(bot, c.id); return
         _mutate(gid, lambda cfg: cfg["tg_links"].__setitem__(f"{which}_secs", 0))
-        _safe_edit_text(bot, _tg_text(gid), c.message.chat.id, c.message.message_id, reply_markup=_tg_kb(gid))
-        bot.answer_callback_query(c.id, "Removed")
+        _show(bot, c, gid, "tg")
+        _answer(bot, c.id, "Removed")
 
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:tg:durcancel:"))
-    def tg_dur_cancel(c):
-        gid = int(c.data.split(":")[3])
-        _safe_edit_text(bot, _tg_text(gid), c.message.chat.id, c.message.message_id, reply_markup=_tg_kb(gid))
+    @router.route("tg", "durcancel")
+    def tg_dur_cancel(c, cb):
+        gid = cb.gid
+        _show(bot, c, gid, "tg")
 
     # TG duration input -> delete prompt → confirmation → Back
-    @bot.message_handler(func=lambda m: PENDING_INPUT.get(m.from_user.id, {}).get("await") == "as_tg_dur")
-    def tg_duration_input(m):
-        ctx = PENDING_INPUT.pop(m.from_user.id)
+    @PENDING.on("as_tg_dur")
+    def tg_duration_input(m, ctx):
         gid, which = ctx["gid"], ctx["which"]
         secs = _parse_duration_to_seconds(m.text or "")
         if secs is None:
-            bot.reply_to(m, "✖️ Invalid duration. Example: <code>30 minutes</code> / <code>2 hours</code>", parse_mode="HTML")
+            _reply(bot, m, "✖️ Invalid duration. Example: <code>30 minutes</code> / <code>2 hours</code>", parse_mode="HTML")
             return
         _mutate(gid, lambda cfg: cfg["tg_links"].__setitem__(f"{which}_secs", int(secs)))
 
         chat_id, msg_id = ctx["reply_to"]
-        try: bot.delete_message(chat_id, msg_id)
+        try: _delete(bot, chat_id, msg_id)
         except Exception: pass
 
         human = _human_duration(int(secs))
         kb = InlineKeyboardMarkup(row_width=1)
         kb.add(InlineKeyboardButton("🔙 Back", callback_data=f"as:tg:ret:{gid}"))
-        bot.send_message(chat_id, f"✅ {which.capitalize()} duration set to: {human}", reply_markup=kb)
+        _send(bot, chat_id, f"✅ {which.capitalize()} duration set to: {human}", reply_markup=kb)
 
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:tg:ret:"))
-    def tg_back_after_set(c):
-        gid = int(c.data.split(":")[3])
-        _safe_edit_text(bot, _tg_text(gid), c.message.chat.id, c.message.message_id, reply_markup=_tg_kb(gid))
+    @router.route("tg", "ret")
+    def tg_back_after_set(c, cb):
+        gid = cb.gid
+        _show(bot, c, gid, "tg")
 
     # -------- Forwarding (final UI) --------
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:fwd:") and c.data.split(":")[2] not in ("sel","pen","del","dur","durset","durcancel"))
-    def fwd_open(c):
-        gid = int(c.data.split(":")[2])
+    @router.route("fwd")
+    def fwd_open(c, cb):
+        gid = cb.gid
         _ensure_defaults(gid)
-        _safe_edit_text(bot, _fwd_text(gid), c.message.chat.id, c.message.message_id,
-                        reply_markup=_fwd_kb(gid))
+        _show(bot, c, gid, "fwd")
 
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:fwd:sel:"))
-    def fwd_sel(c):
-        _,_,_, gid, which = c.data.split(":"); gid = int(gid)
-        if which not in ("channels","groups","users","bots"): bot.answer_callback_query(c.id); return
+    @router.route("fwd", "sel")
+    def fwd_sel(c, cb):
+        gid, (which,) = cb.gid, cb.args
+        if which not in ("channels","groups","users","bots"): _answer(bot, c.id); return
         def _toggle(cfg):
             fwd = cfg["forwarding"]
             if fwd.get("selected") == which:
@@ -630,74 +1024,69 @@ def register(bot):
                 fwd["selected"] = which
                 fwd["expanded"] = True
         _mutate(gid, _toggle)
-        _safe_edit_text(bot, _fwd_text(gid), c.message.chat.id, c.message.message_id,
-                        reply_markup=_fwd_kb(gid))
-        bot.answer_callback_query(c.id)
-
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:fwd:pen:"))
-    def fwd_pen(c):
-        _,_,_, gid, which, pen = c.data.split(":"); gid = int(gid)
-        if which not in ("channels","groups","users","bots"): bot.answer_callback_query(c.id); return
-        if pen not in ("off","warn","kick","mute","ban"): bot.answer_callback_query(c.id); return
+        _show(bot, c, gid, "fwd")
+        _answer(bot, c.id)
+
+    @router.route("fwd", "pen")
+    def fwd_pen(c, cb):
+        gid, (which, pen) = cb.gid, cb.args
+        if which not in ("channels","groups","users","bots"): _answer(bot, c.id); return
+        if pen not in ("off","warn","kick","mute","ban"): _answer(bot, c.id); return
         def _set(cfg):
             cfg["forwarding"][which]["penalty"] = pen
             cfg["forwarding"]["selected"] = which
             cfg["forwarding"]["expanded"] = True
         _mutate(gid, _set)
-        _safe_edit_text(bot, _fwd_text(gid), c.message.chat.id, c.message.message_id,
-                        reply_markup=_fwd_kb(gid))
-        bot.answer_callback_query(c.id, "Penalty set")
+        _show(bot, c, gid, "fwd")
+        _answer(bot, c.id, "Penalty set")
 
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:fwd:del:"))
-    def fwd_del(c):
-        _,_,_, gid, which = c.data.split(":"); gid = int(gid)
+    @router.route("fwd", "del")
+    def fwd_del(c, cb):
+        gid, (which,) = cb.gid, cb.args
         def _flip(cfg):
             cur = cfg["forwarding"][which]["delete"]
             cfg["forwarding"][which]["delete"] = not cur
             cfg["forwarding"]["selected"] = which
             cfg["forwarding"]["expanded"] = True
         _mutate(gid, _flip)
-        _safe_edit_text(bot, _fwd_text(gid), c.message.chat.id, c.message.message_id,
-                        reply_markup=_fwd_kb(gid))
-        bot.answer_callback_query(c.id, "Updated")
-
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:fwd:dur:"))
-    def fwd_dur_prompt_cb(c):
-        _,_,_, gid, which, kind = c.data.split(":"); gid = int(gid)
-        if which not in ("channels","groups","users","bots"): bot.answer_callback_query(c.id); return
-        if kind  not in ("mute","warn","ban"): bot.answer_callback_query(c.id); return
+        _show(bot, c, gid, "fwd")
+        _answer(bot, c.id, "Updated")
+
+    @router.route("fwd", "dur")
+    def fwd_dur_prompt_cb(c, cb):
+        gid, (which, kind) = cb.gid, cb.args
+        if which not in ("channels","groups","users","bots"): _answer(bot, c.id); return
+        if kind  not in ("mute","warn","ban"): _answer(bot, c.id); return
         txt, kb = _fwd_dur_prompt(gid, which, kind)
-        PENDING_INPUT[c.from_user.id] = {"await":"as_fwd_dur","gid":gid,"which":which,"kind":kind,
-                                         "reply_to":(c.message.chat.id, c.message.message_id)}
+        PENDING.put(c.message.chat.id, c.from_user.id,
+                    {"await":"as_fwd_dur","gid":gid,"which":which,"kind":kind,
+                     "reply_to":(c.message.chat.id, c.message.message_id)})
         _safe_edit_text(bot, txt, c.message.chat.id, c.message.message_id, reply_markup=kb, parse_mode="HTML")
 
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:fwd:durset:"))
-    def fwd_dur_zero(c):
-        _,_,_, gid, which, kind, val = c.data.split(":"); gid = int(gid)
-        if val != "0": bot.answer_callback_query(c.id); return
+    @router.route("fwd", "durset")
+    def fwd_dur_zero(c, cb):
+        gid, (which, kind, val) = cb.gid, cb.args
+        if val != "0": _answer(bot, c.id); return
         def _set0(cfg):
             cfg["forwarding"][which][f"{kind}_secs"] = 0
             cfg["forwarding"]["selected"] = which
             cfg["forwarding"]["expanded"] = True
         _mutate(gid, _set0)
-        _safe_edit_text(bot, _fwd_text(gid), c.message.chat.id, c.message.message_id,
-                        reply_markup=_fwd_kb(gid))
-        bot.answer_callback_query(c.id, "Removed")
+        _show(bot, c, gid, "fwd")
+        _answer(bot, c.id, "Removed")
 
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:fwd:durcancel:"))
-    def fwd_dur_cancel(c):
-        gid = int(c.data.split(":")[3])
+    @router.route("fwd", "durcancel")
+    def fwd_dur_cancel(c, cb):
+        gid = cb.gid
         _mutate(gid, lambda cfg: cfg["forwarding"].__setitem__("expanded", True))
-        _safe_edit_text(bot, _fwd_text(gid), c.message.chat.id, c.message.message_id,
-                        reply_markup=_fwd_kb(gid))
+        _show(bot, c, gid, "fwd")
 
-    @bot.message_handler(func=lambda m: PENDING_INPUT.get(m.from_user.id, {}).get("await") == "as_fwd_dur")
-    def fwd_duration_input(m):
-        ctx = PENDING_INPUT.pop(m.from_user.id)
+    @PENDING.on("as_fwd_dur")
+    def fwd_duration_input(m, ctx):
         gid, which, kind = ctx["gid"], ctx["which"], ctx["kind"]
         secs = _parse_duration_to_seconds(m.text or "")
         if secs is None:
-            bot.reply_to(m, "✖️ Invalid duration. Example: <code>30 minutes</code>", parse_mode="HTML")
+            _reply(bot, m, "✖️ Invalid duration. Example: <code>30 minutes</code>", parse_mode="HTML")
             return
         def _apply(cfg):
             cfg["forwarding"][which][f"{kind}_secs"] = int(secs)
@@ -705,89 +1094,28 @@ def register(bot):
             cfg["forwarding"]["expanded"] = True
         _mutate(gid, _apply)
         chat_id, msg_id = ctx["reply_to"]
-        try: bot.delete_message(chat_id, msg_id)
+        try: _delete(bot, chat_id, msg_id)
         except Exception: pass
         human = _human_duration(int(secs))
         kb = InlineKeyboardMarkup(row_width=1)
         kb.add(InlineKeyboardButton("🔙 Back", callback_data=f"as:fwd:sel:{gid}:{which}"))
-        bot.send_message(chat_id, f"✅ {kind.capitalize()} duration set to: {human}", reply_markup=kb)
-
-    # -------- Total links block --------
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:all:") and c.data.split(":")[2] not in ("pen","del","dur","durset","durcancel","ret"))
-    def all_open(c):
-        gid = int(c.data.split(":")[2])
-        _ensure_defaults(gid)
-        _safe_edit_text(bot, _all_text(gid), c.message.chat.id, c.message.message_id, reply_markup=_all_kb(gid))
-
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:all:pen:"))
-    def all_pen_set(c):
-        _, _, _, gid, val = c.data.split(":"); gid = int(gid)
-        if val not in ("off","warn","kick","mute","ban"): bot.answer_callback_query(c.id); return
-        _mutate(gid, lambda cfg: cfg["total_links"].__setitem__("penalty", val))
-        _safe_edit_text(bot, _all_text(gid), c.message.chat.id, c.message.message_id, reply_markup=_all_kb(gid))
-        bot.answer_callback_query(c.id, "Penalty set")
-
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:all:del:"))
-    def all_del_toggle(c):
-        _, _, _, gid = c.data.split(":"); gid = int(gid)
-        _mutate(gid, lambda cfg: cfg["total_links"].__setitem__("delete", not cfg["total_links"]["delete"]))
-        _safe_edit_text(bot, _all_text(gid), c.message.chat.id, c.message.message_id, reply_markup=_all_kb(gid))
-        bot.answer_callback_query(c.id, "Updated")
-
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:all:dur:"))
-    def all_dur_prompt(c):
-        _, _, _, gid, which = c.data.split(":"); gid = int(gid)
-        if which not in ("mute","warn","ban"): bot.answer_callback_query(c.id); return
-        txt, kb = _all_dur_prompt(gid, which)
-        PENDING_INPUT[c.from_user.id] = {"await":"as_all_dur", "gid":gid, "which":which,
-                                         "reply_to":(c.message.chat.id, c.message.message_id)}
-        _safe_edit_text(bot, txt, c.message.chat.id, c.message.message_id, reply_markup=kb, parse_mode="HTML")
-
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:all:durset:"))
-    def all_dur_set_zero(c):
-        _, _, _, gid, which, val = c.data.split(":"); gid = int(gid)
-        if which not in ("mute","warn","ban") or val != "0": bot.answer_callback_query(c.id); return
-        _mutate(gid, lambda cfg: cfg["total_links"].__setitem__(f"{which}_secs", 0))
-        _safe_edit_text(bot, _all_text(gid), c.message.chat.id, c.message.message_id, reply_markup=_all_kb(gid))
-        bot.answer_callback_query(c.id, "Removed")
-
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:all:durcancel:"))
-    def all_dur_cancel(c):
-        gid = int(c.data.split(":")[3])
-        _safe_edit_text(bot, _all_text(gid), c.message.chat.id, c.message.message_id, reply_markup=_all_kb(gid))
-
-    @bot.message_handler(func=lambda m: PENDING_INPUT.get(m.from_user.id, {}).get("await") == "as_all_dur")
-    def handle_all_duration_input(m):
-        ctx = PENDING_INPUT.pop(m.from_user.id)
-        gid, which = ctx["gid"], ctx["which"]
-        secs = _parse_duration_to_seconds(m.text or "")
-        if secs is None:
-            bot.reply_to(m, "✖️ Invalid duration. Example: <code>30 minutes</code> / <code>2 hours</code>", parse_mode="HTML")
-            return
+        _send(bot, chat_id, f"✅ {kind.capitalize()} duration set to: {human}", reply_markup=kb)
 
-        _mutate(gid, lambda cfg: cfg["total_links"].__setitem__(f"{which}_secs", int(secs)))
-
-        chat_id, msg_id = ctx["reply_to"]
-        try: bot.delete_message(chat_id, msg_id)
-        except Exception: pass
-
-        human = _human_duration(int(secs))
-        kb = InlineKeyboardMarkup(row_width=1)
-        kb.add(InlineKeyboardButton("🔙 Back", callback_data=f"as:all:ret:{gid}"))
-        bot.send_message(chat_id, f"✅ Duration set to: {human}", reply_markup=kb)
+    # -------- Total links block / Copy-paste waves --------
+    for code in _SIMPLE:
+        _register_simple(router, bot, code)
 
     # -------- Quote (new UI like Forwarding) --------
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:quote:") and c.data.split(":")[2] not in ("sel","pen","del","dur","durset","durcancel"))
-    def quote_open(c):
-        gid = int(c.data.split(":")[2])
+    @router.route("quote")
+    def quote_open(c, cb):
+        gid = cb.gid
         _ensure_defaults(gid)
-        _safe_edit_text(bot, _quote_text(gid), c.message.chat.id, c.message.message_id,
-                        reply_markup=_quote_kb(gid))
+        _show(bot, c, gid, "quote")
 
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:quote:sel:"))
-    def quote_sel(c):
-        _,_,_, gid, which = c.data.split(":"); gid = int(gid)
-        if which not in ("channels","groups","users","bots"): bot.answer_callback_query(c.id); return
+    @router.route("quote", "sel")
+    def quote_sel(c, cb):
+        gid, (which,) = cb.gid, cb.args
+        if which not in ("channels","groups","users","bots"): _answer(bot, c.id); return
         def _toggle(cfg):
             qt = cfg["quote_block"]
             if qt.get("selected") == which:
@@ -796,74 +1124,69 @@ def register(bot):
                 qt["selected"] = which
                 qt["expanded"] = True
         _mutate(gid, _toggle)
-        _safe_edit_text(bot, _quote_text(gid), c.message.chat.id, c.message.message_id,
-                        reply_markup=_quote_kb(gid))
-        bot.answer_callback_query(c.id)
-
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:quote:pen:"))
-    def quote_pen(c):
-        _,_,_, gid, which, pen = c.data.split(":"); gid = int(gid)
-        if which not in ("channels","groups","users","bots"): bot.answer_callback_query(c.id); return
-        if pen not in ("off","warn","kick","mute","ban"): bot.answer_callback_query(c.id); return
+        _show(bot, c, gid, "quote")
+        _answer(bot, c.id)
+
+    @router.route("quote", "pen")
+    def quote_pen(c, cb):
+        gid, (which, pen) = cb.gid, cb.args
+        if which not in ("channels","groups","users","bots"): _answer(bot, c.id); return
+        if pen not in ("off","warn","kick","mute","ban"): _answer(bot, c.id); return
         def _set(cfg):
             cfg["quote_block"][which]["penalty"] = pen
             cfg["quote_block"]["selected"] = which
             cfg["quote_block"]["expanded"] = True
         _mutate(gid, _set)
-        _safe_edit_text(bot, _quote_text(gid), c.message.chat.id, c.message.message_id,
-                        reply_markup=_quote_kb(gid))
-        bot.answer_callback_query(c.id, "Penalty set")
+        _show(bot, c, gid, "quote")
+        _answer(bot, c.id, "Penalty set")
 
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:quote:del:"))
-    def quote_del(c):
-        _,_,_, gid, which = c.data.split(":"); gid = int(gid)
+    @router.route("quote", "del")
+    def quote_del(c, cb):
+        gid, (which,) = cb.gid, cb.args
         def _flip(cfg):
             cur = cfg["quote_block"][which]["delete"]
             cfg["quote_block"][which]["delete"] = not cur
             cfg["quote_block"]["selected"] = which
             cfg["quote_block"]["expanded"] = True
         _mutate(gid, _flip)
-        _safe_edit_text(bot, _quote_text(gid), c.message.chat.id, c.message.message_id,
-                        reply_markup=_quote_kb(gid))
-        bot.answer_callback_query(c.id, "Updated")
-
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:quote:dur:"))
-    def quote_dur_prompt_cb(c):
-        _,_,_, gid, which, kind = c.data.split(":"); gid = int(gid)
-        if which not in ("channels","groups","users","bots"): bot.answer_callback_query(c.id); return
-        if kind  not in ("mute","warn","ban"): bot.answer_callback_query(c.id); return
+        _show(bot, c, gid, "quote")
+        _answer(bot, c.id, "Updated")
+
+    @router.route("quote", "dur")
+    def quote_dur_prompt_cb(c, cb):
+        gid, (which, kind) = cb.gid, cb.args
+        if which not in ("channels","groups","users","bots"): _answer(bot, c.id); return
+        if kind  not in ("mute","warn","ban"): _answer(bot, c.id); return
         txt, kb = _quote_dur_prompt(gid, which, kind)
-        PENDING_INPUT[c.from_user.id] = {"await":"as_quote_dur","gid":gid,"which":which,"kind":kind,
-                                         "reply_to":(c.message.chat.id, c.message.message_id)}
+        PENDING.put(c.message.chat.id, c.from_user.id,
+                    {"await":"as_quote_dur","gid":gid,"which":which,"kind":kind,
+                     "reply_to":(c.message.chat.id, c.message.message_id)})
         _safe_edit_text(bot, txt, c.message.chat.id, c.message.message_id, reply_markup=kb, parse_mode="HTML")
 
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:quote:durset:"))
-    def quote_dur_zero(c):
-        _,_,_, gid, which, kind, val = c.data.split(":"); gid = int(gid)
-        if val != "0": bot.answer_callback_query(c.id); return
+    @router.route("quote", "durset")
+    def quote_dur_zero(c, cb):
+        gid, (which, kind, val) = cb.gid, cb.args
+        if val != "0": _answer(bot, c.id); return
         def _set0(cfg):
             cfg["quote_block"][which][f"{kind}_secs"] = 0
             cfg["quote_block"]["selected"] = which
             cfg["quote_block"]["expanded"] = True
         _mutate(gid, _set0)
-        _safe_edit_text(bot, _quote_text(gid), c.message.chat.id, c.message.message_id,
-                        reply_markup=_quote_kb(gid))
-        bot.answer_callback_query(c.id, "Removed")
+        _show(bot, c, gid, "quote")
+        _answer(bot, c.id, "Removed")
 
-    @bot.callback_query_handler(func=lambda c: c.data.startswith("as:quote:durcancel:"))
-    def quote_dur_cancel(c):
-        gid = int(c.data.split(":")[3])
+    @router.route("quote", "durcancel")
+    def quote_dur_cancel(c, cb):
+        gid = cb.gid
         _mutate(gid, lambda cfg: cfg["quote_block"].__setitem__("expanded", True))
-        _safe_edit_text(bot, _quote_text(gid), c.message.chat.id, c.message.message_id,
-                        reply_markup=_quote_kb(gid))
+        _show(bot, c, gid, "quote")
 
-    @bot.message_handler(func=lambda m: PENDING_INPUT.get(m.from_user.id, {}).get("await") == "as_quote_dur")
-    def quote_duration_input(m):
-        ctx = PENDING_INPUT.pop(m.from_user.id)
+    @PENDING.on("as_quote_dur")
+    def quote_duration_input(m, ctx):
         gid, which, kind = ctx["gid"], ctx["which"], ctx["kind"]
         secs = _parse_duration_to_seconds(m.text or "")
         if secs is None:
-            bot.reply_to(m, "✖️ Invalid duration. Example: <code>30 minutes</code>", parse_mode="HTML")
+            _reply(bot, m, "✖️ Invalid duration. Example: <code>30 minutes</code>", parse_mode="HTML")
             return
         def _apply(cfg):
             cfg["quote_block"][which][f"{kind}_secs"] = int(secs)
@@ -871,10 +1194,10 @@ def register(bot):
             cfg["quote_block"]["expanded"] = True
         _mutate(gid, _apply)
         chat_id, msg_id = ctx["reply_to"]
-        try: bot.delete_message(chat_id, msg_id)
+        try: _delete(bot, chat_id, msg_id)
         except Exception: pass
         human = _human_duration(int(secs))
         kb = InlineKeyboardMarkup(row_width=1)
         kb.add(InlineKeyboardButton("🔙 Back", callback_data=f"as:quote:sel:{gid}:{which}"))
-        bot.send_message(chat_id, f"✅ {kind.capitalize()} duration set to: {human}", reply_markup=kb)
+        _send(bot, chat_id, f"✅ {kind.capitalize()} duration set to: {human}", reply_markup=kb)
 
@@ -0,0 +1,132 @@
+# modules/antispam_actions.py
+from __future__ import annotations
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from antispam_policy import Penalty
+
+DELETE_CHUNK = 100  # deleteMessages takes at most 100 ids per call
+
+
+class ActionPipeline:
+    """Queues moderation actions per chat and carries them out in batches.
+
+    Each chat has its own queue that at most one worker drains at a time, so a
+    chat's actions keep their order while different chats run concurrently on
+    a small thread pool. A drain waits ``linger`` seconds for the rest of a
+    burst, then takes everything queued: all deletes first, in chunks of 100
+    through the ``delete`` handler, so spam disappears before anything else is
+    sent, then penalties in arrival order and one per user (the strongest). A
+    penalty is skipped if the user already got the same or a stronger one in
+    that chat within ``dedupe_secs``.
+
+    Handlers: ``on("delete")(fn(chat_id, message_ids))`` and
+    ``on("punish")(fn(chat_id, user_id, penalty, secs))``.
+    """
+
+    def __init__(self, max_workers: int = 16, linger: float = 0.1, dedupe_secs: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.linger = linger
+        self.dedupe_secs = dedupe_secs
+        self._clock = clock
+        self._handlers: Dict[str, Callable] = {}
+        self._queues: Dict[int, List[Tuple[int, Optional[Penalty], int]]] = {}
+        self._active: set = set()
+        self._recent: Dict[Tuple[int, int], Tuple[Penalty, float]] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="antispam-actions")
+        self.calls = 0
+        self.deleted = 0
+        self.punished = 0
+        self.deduped = 0
+
+    def on(self, kind: str):
+        def deco(fn):
+            self._handlers[kind] = fn
+            return fn
+        return deco
+
+    def delete(self, chat_id: int, message_id: int):
+        self._enqueue(chat_id, (message_id, None, 0))
+
+    def punish(self, chat_id: int, user_id: int, penalty: Penalty, secs: int = 0):
+        if penalty in (Penalty.KICK, Penalty.MUTE, Penalty.BAN):
+            self._enqueue(chat_id, (user_id, penalty, secs))
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "deleted": self.deleted, "punished": self.punished,
+                "deduped": self.deduped, "queued_chats": len(self._queues)}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+    def _enqueue(self, chat_id: int, item):
+        with self._lock:
+            self._queues.setdefault(chat_id, []).append(item)
+            if chat_id in self._active:
+                return
+            self._active.add(chat_id)
+        self._pool.submit(self._drain, chat_id)
+
+    def _drain(self, chat_id: int):
+        if self.linger:
+            time.sleep(self.linger)
+        while True:
+            with self._lock:
+                items = self._queues.pop(chat_id, None)
+                if not items:
+                    self._active.discard(chat_id)
+                    return
+            try:
+                self._run(chat_id, items)
+            except Exception:
+                pass  # one bad batch must not stall the chat's queue
+
+    def _run(self, chat_id: int, items):
+        ids: List[int] = []
+        penalties: Dict[int, Tuple[Penalty, int]] = {}
+        for target, penalty, secs in items:
+            if penalty is None:
+                ids.append(target)
+            elif target not in penalties or penalty > penalties[target][0]:
+                penalties[target] = (penalty, secs)
+
+        delete = self._handlers.get("delete")
+        if delete is not None and ids:
+            ids = sorted(set(ids))
+            for i in range(0, len(ids), DELETE_CHUNK):
+                chunk = ids[i:i + DELETE_CHUNK]
+                self.calls += 1
+                try:
+                    delete(chat_id, chunk)
+                    self.deleted += len(chunk)
+                except Exception:
+                    pass  # messages already deleted or too old
+
+        punish = self._handlers.get("punish")
+        now = self._clock()
+        for user_id, (penalty, secs) in penalties.items():
+            if not self._fresh(chat_id, user_id, penalty, now):
+                self.deduped += 1
+                continue
+            if punish is not None:
+                self.calls += 1
+                try:
+                    punish(chat_id, user_id, penalty, secs)
+                    self.punished += 1
+                except Exception:
+                    pass  # already gone / not enough rights; nothing to retry
+
+    def _fresh(self, chat_id: int, user_id: int, penalty: Penalty, now: float) -> bool:
+        key = (chat_id, user_id)
+        with self._lock:
+            last = self._recent.get(key)
+            if last is not None and last[1] > now and last[0] >= penalty:
+                return False
+            if len(self._recent) >= 10_000:
+                for k in [k for k, (_, until) in self._recent.items() if until <= now]:
+                    del self._recent[k]
+            self._recent[key] = (penalty, now + self.dedupe_secs)
+            return True
@@ -0,0 +1,92 @@
+# modules/antispam_admins.py
+from __future__ import annotations
+import threading
+import time
+from typing import Callable, Dict, FrozenSet, Iterable, Optional, Tuple
+
+ADMIN_STATUSES = ("creator", "administrator")
+
+
+class AdminRoster:
+    """Per-group set of admin user ids, so an admin check is a local set lookup.
+
+    A group's roster is bulk-loaded with ``fetch(bot, gid)`` (getChatAdministrators)
+    the first time it is needed and again once it is ``ttl`` seconds old; only
+    one thread loads a given group at a time, the others reuse the previous
+    roster meanwhile (or wait for the first load). ``chat_member`` updates keep
+    loaded rosters current between reloads. If a group can't be loaded at all,
+    ``fallback(bot, gid, user_id)`` answers instead.
+    """
+
+    def __init__(self, fetch: Callable, fallback: Optional[Callable] = None, ttl: float = 10 * 60,
+                 wait: float = 10.0, clock: Callable[[], float] = time.monotonic):
+        self.fetch = fetch
+        self.fallback = fallback
+        self.ttl = ttl
+        self.wait = wait  # how long a caller waits for another thread's first load
+        self._clock = clock
+        self._groups: Dict[int, Tuple[float, FrozenSet[int]]] = {}
+        self._inflight: Dict[int, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def is_admin(self, bot, gid: int, user_id: int) -> bool:
+        hit = self._groups.get(gid)
+        if hit is None or self._clock() - hit[0] >= self.ttl:
+            ids = self._refresh(bot, gid, stale=hit[1] if hit else None)
+            if ids is None:
+                return bool(self.fallback and self.fallback(bot, gid, user_id))
+            return user_id in ids
+        return user_id in hit[1]
+
+    def admins(self, gid: int) -> Optional[FrozenSet[int]]:
+        hit = self._groups.get(gid)
+        return hit[1] if hit else None
+
+    def set_admins(self, gid: int, user_ids: Iterable[int]):
+        with self._lock:
+            self._groups[gid] = (self._clock(), frozenset(user_ids))
+
+    def invalidate(self, gid: int):
+        with self._lock:
+            self._groups.pop(gid, None)
+
+    def on_chat_member(self, update):
+        """Apply a telebot ChatMemberUpdated (promotion, demotion, admin leaving)."""
+        gid = update.chat.id
+        member = update.new_chat_member
+        with self._lock:
+            hit = self._groups.get(gid)
+            if hit is None:
+                return  # not loaded yet; the first check will load the current list
+            stamp, ids = hit
+            uid = member.user.id
+            if member.status in ADMIN_STATUSES:
+                ids = ids | {uid}
+            else:
+                ids = ids - {uid}
+            self._groups[gid] = (stamp, ids)
+
+    def _refresh(self, bot, gid: int, stale: Optional[FrozenSet[int]]) -> Optional[FrozenSet[int]]:
+        with self._lock:
+            ev = self._inflight.get(gid)
+            leader = ev is None
+            if leader:
+                ev = self._inflight[gid] = threading.Event()
+        if not leader:
+            if stale is not None:
+                return stale
+            ev.wait(self.wait)
+            return self.admins(gid)
+        try:
+            members = self.fetch(bot, gid)
+            ids = frozenset(m.user.id for m in members if m.status in ADMIN_STATUSES)
+            self.set_admins(gid, ids)
+            self.loads += 1
+            return ids
+        except Exception:
+            return stale
+        finally:
+            with self._lock:
+                del self._inflight[gid]
+            ev.set()
@@ -0,0 +1,126 @@
+# modules/antispam_dupes.py
+from __future__ import annotations
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, List, Optional, Set, Tuple
+
+MIN_CHARS = 20      # shorter texts ("ok", "thanks") collide all the time; never compared
+MAX_CHARS = 1000    # only the start of long texts is fingerprinted (keeps every lane count < 1024)
+SHINGLE = 4         # character n-grams
+
+_NOISE = re.compile(r"[\W_]+")
+_DIGITS = str.maketrans("0123456789", "0000000000")
+
+# SimHash accumulates +1 per set bit of every shingle hash. Instead of 64 Python
+# additions per shingle, each hash bit gets a 10-bit lane of one big integer:
+# _LANES[i][byte] spreads byte i of a hash into its 8 lanes, so a shingle costs
+# 8 table lookups and the per-bit counts come out of a single running sum.
+_LANE = 10
+_LANE_MASK = (1 << _LANE) - 1
+_MASK64 = (1 << 64) - 1
+
+
+def _spread(byte: int) -> int:
+    return sum(1 << (_LANE * j) for j in range(8) if byte >> j & 1)
+
+
+_LANES = [[_spread(b) << (8 * _LANE * i) for b in range(256)] for i in range(8)]
+
+
+def normalize(text: str) -> str:
+    """Lowercase, digits folded to 0, punctuation / emoji / whitespace runs to one space."""
+    return _NOISE.sub(" ", text.lower().translate(_DIGITS)).strip()
+
+
+def simhash(text: Optional[str]) -> Optional[int]:
+    """64-bit SimHash over character shingles; None for texts too short to judge.
+
+    Uses the built-in str hash, so fingerprints are only comparable within one process.
+    """
+    if not text:
+        return None
+    norm = normalize(text)[:MAX_CHARS]
+    if len(norm) < MIN_CHARS:
+        return None
+    shingles = {norm[i:i + SHINGLE] for i in range(len(norm) - SHINGLE + 1)}
+    t0, t1, t2, t3, t4, t5, t6, t7 = _LANES
+    acc = 0
+    for s in shingles:
+        h = hash(s) & _MASK64
+        acc += (t0[h & 255] + t1[h >> 8 & 255] + t2[h >> 16 & 255] + t3[h >> 24 & 255]
+                + t4[h >> 32 & 255] + t5[h >> 40 & 255] + t6[h >> 48 & 255] + t7[h >> 56])
+    half = len(shingles) // 2
+    fp = 0
+    for bit in range(64):
+        if (acc >> (_LANE * bit)) & _LANE_MASK > half:
+            fp |= 1 << bit
+    return fp
+
+
+class WaveDetector:
+    """Copy-paste raids: the same text (give or take a few words) from several users at once.
+
+    Each group keeps a sliding window of recent fingerprints (at most
+    ``per_group`` entries, none older than ``window_secs``), and at most
+    ``max_groups`` groups are tracked (least recently active dropped first),
+    so memory is bounded. A text is part of a wave once ``min_users``
+    different users posted near-duplicates of it (SimHash distance <=
+    ``distance``) inside the window.
+    """
+
+    def __init__(self, window_secs: float = 120.0, per_group: int = 200, max_groups: int = 5000,
+                 distance: int = 8, min_users: int = 3, clock: Callable[[], float] = time.monotonic):
+        self.window_secs = window_secs
+        self.per_group = per_group
+        self.max_groups = max_groups
+        self.distance = distance
+        self.min_users = min_users
+        self._clock = clock
+        # gid -> (recent (ts, fp, user_id, message_id), message ids already reported)
+        self._groups: "OrderedDict[int, Tuple[Deque[tuple], Set[int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.waves = 0
+
+    def check(self, gid: int, user_id: int, message_id: int, text: Optional[str]) -> List[Tuple[int, int]]:
+        """Record a message; returns the (user_id, message_id) pairs of a wave it belongs to.
+
+        The first message that completes a wave returns every near-duplicate
+        still in the window; later ones return only themselves. Empty if the
+        message isn't (yet) part of a wave.
+        """
+        fp = simhash(text)
+        if fp is None:
+            return []
+        now = self._clock()
+        with self._lock:
+            recent, reported = self._group(gid)
+            cutoff = now - self.window_secs
+            while recent and recent[0][0] < cutoff:
+                reported.discard(recent.popleft()[3])
+            if len(recent) == recent.maxlen:
+                reported.discard(recent[0][3])
+            d = self.distance
+            similar = [e for e in recent if (e[1] ^ fp).bit_count() <= d]
+            recent.append((now, fp, user_id, message_id))
+            users = {e[2] for e in similar}
+            users.add(user_id)
+            if len(users) < self.min_users:
+                return []
+            hits = [(e[2], e[3]) for e in similar if e[3] not in reported]
+            hits.append((user_id, message_id))
+            if len(hits) > 1:
+                self.waves += 1
+            reported.update(m for _, m in hits)
+            return hits
+
+    def _group(self, gid: int):
+        g = self._groups.get(gid)
+        if g is None:
+            g = self._groups[gid] = (deque(maxlen=self.per_group), set())
+            if len(self._groups) > self.max_groups:
+                self._groups.popitem(last=False)
+        else:
+            self._groups.move_to_end(gid)
+        return g
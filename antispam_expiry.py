@@ -0,0 +1,190 @@
+# modules/antispam_expiry.py
+from __future__ import annotations
+import atexit
+import heapq
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+Key = Tuple[int, int, str]  # (chat_id, user_id, kind)
+
+
+class ExpiryScheduler:
+    """When timed penalties (mute / ban / warn) lapse, persisted in SQLite.
+
+    Every pending expiry is one fixed-size row ``(chat_id, user_id, kind,
+    expires_at)`` with an index on ``expires_at``; only the next ``window``
+    seconds of it are kept in an in-memory min-heap, refilled by an index
+    range scan. A restart therefore resumes from the index instead of reading
+    every record, and overdue rows are fired on the first pass.
+
+    Due entries are handed to the function registered for their kind in
+    batches of ``(chat_id, user_id)``; kinds without a handler are dropped.
+    New schedules are buffered and written in one transaction per tick.
+    Scheduling a key again replaces its previous expiry.
+    """
+
+    def __init__(self, path: str, window: float = 60.0, batch: int = 5000, tick: float = 1.0,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.window = window
+        self.batch = batch
+        self.tick = tick
+        self._clock = clock
+        self._handlers: Dict[str, Callable[[List[Tuple[int, int]]], None]] = {}
+        self._heap: List[Tuple[float, Key]] = []
+        self._due: Dict[Key, float] = {}  # keys in the heap window -> their current expiry
+        self._writes: Dict[Key, Optional[float]] = {}  # not yet persisted; None = cancelled
+        self._horizon = float("-inf")  # everything in the db up to here is in the heap
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._db: Optional[sqlite3.Connection] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.fired = 0
+
+    def on(self, kind: str):
+        def deco(fn):
+            self._handlers[kind] = fn
+            return fn
+        return deco
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if self.path != ":memory:" and os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        db = self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("CREATE TABLE IF NOT EXISTS expiries (chat_id INTEGER NOT NULL, user_id INTEGER NOT NULL,"
+                   " kind TEXT NOT NULL, expires_at REAL NOT NULL, PRIMARY KEY (chat_id, user_id, kind))"
+                   " WITHOUT ROWID")
+        db.execute("CREATE INDEX IF NOT EXISTS expiries_at ON expiries (expires_at)")
+        self._thread = threading.Thread(target=self._run, name="penalty-expiry", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def close(self):
+        if self._closed or self._thread is None:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self._flush_writes()
+        self._db.close()
+
+    def schedule(self, chat_id: int, user_id: int, kind: str, secs: float):
+        at = self._clock() + secs
+        key = (chat_id, user_id, kind)
+        with self._lock:
+            self._writes[key] = at
+            if at <= self._horizon:
+                self._due[key] = at
+                wake = not self._heap or at < self._heap[0][0]
+                heapq.heappush(self._heap, (at, key))
+            else:
+                self._due.pop(key, None)  # the refill will pick it up at its new time
+                wake = False
+        if wake:
+            self._wake.set()
+
+    def cancel(self, chat_id: int, user_id: int, kind: str):
+        key = (chat_id, user_id, kind)
+        with self._lock:
+            self._writes[key] = None
+            self._due.pop(key, None)
+
+    def pending(self) -> int:
+        """Expiries currently held in memory (the next ``window`` seconds)."""
+        return len(self._due)
+
+    def stats(self) -> dict:
+        return {"window": len(self._due), "unwritten": len(self._writes), "fired": self.fired}
+
+    # ---- scheduler thread ----
+    def _run(self):
+        while not self._closed:
+            try:
+                self._flush_writes()
+                now = self._clock()
+                if self._horizon - now < self.window / 2:
+                    self._refill(now + self.window)
+                self._fire(now)
+            except Exception:
+                pass  # db hiccup or failing handler; the next tick carries on
+            with self._lock:
+                top = self._heap[0][0] if self._heap else float("inf")
+            self._wake.wait(max(0.0, min(self.tick, top - self._clock())))
+            self._wake.clear()
+
+    def _flush_writes(self):
+        with self._lock:
+            writes, self._writes = self._writes, {}
+        if not writes:
+            return
+        ups = [(c, u, k, at) for (c, u, k), at in writes.items() if at is not None]
+        dels = [key for key, at in writes.items() if at is None]
+        db = self._db
+        db.execute("BEGIN")
+        try:
+            db.executemany("INSERT OR REPLACE INTO expiries VALUES (?, ?, ?, ?)", ups)
+            db.executemany("DELETE FROM expiries WHERE chat_id = ? AND user_id = ? AND kind = ?", dels)
+        except Exception:
+            db.execute("ROLLBACK")
+            with self._lock:
+                for key, at in writes.items():
+                    self._writes.setdefault(key, at)
+            raise
+        db.execute("COMMIT")
+
+    def _refill(self, until: float):
+        rows = self._db.execute(
+            "SELECT chat_id, user_id, kind, expires_at FROM expiries"
+            " WHERE expires_at >= ? AND expires_at <= ? ORDER BY expires_at LIMIT ?",
+            (self._horizon, until, self.batch)).fetchall()
+        with self._lock:
+            for c, u, k, at in rows:
+                key = (c, u, k)
+                if key in self._writes or self._due.get(key) == at:
+                    continue  # changed since, or already loaded
+                self._due[key] = at
+                heapq.heappush(self._heap, (at, key))
+            # a full page means there is more before `until`; continue from the last row next time
+            self._horizon = rows[-1][3] if len(rows) >= self.batch else until
+            # schedules that arrived while we were reading aren't in the db yet
+            for key, at in self._writes.items():
+                if at is not None and at <= self._horizon and self._due.get(key) != at:
+                    self._due[key] = at
+                    heapq.heappush(self._heap, (at, key))
+
+    def _fire(self, now: float):
+        fired: List[Tuple[int, int, str, float]] = []
+        with self._lock:
+            heap, due = self._heap, self._due
+            while heap and heap[0][0] <= now and len(fired) < self.batch:
+                at, key = heapq.heappop(heap)
+                if due.get(key) != at:
+                    continue  # rescheduled or cancelled
+                del due[key]
+                fired.append((*key, at))
+        if not fired:
+            return
+        self._db.execute("BEGIN")
+        self._db.executemany("DELETE FROM expiries WHERE chat_id = ? AND user_id = ? AND kind = ? AND expires_at = ?",
+                             fired)
+        self._db.execute("COMMIT")
+        self.fired += len(fired)
+        by_kind: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for c, u, k, _ in fired:
+            by_kind[k].append((c, u))
+        for kind, batch in by_kind.items():
+            fn = self._handlers.get(kind)
+            if fn is not None:
+                try:
+                    fn(batch)
+                except Exception:
+                    pass  # Telegram also lifts timed restrictions itself via until_date
@@ -0,0 +1,84 @@
+# modules/antispam_pending.py
+from __future__ import annotations
+import heapq
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+Key = Tuple[int, int]  # (chat_id, user_id)
+
+
+class PendingInputs:
+    """Prompts waiting for an admin's next text message, keyed by (chat, user).
+
+    Entries expire ``ttl`` seconds after the prompt was shown, so an admin who
+    walks away doesn't leave state behind forever. Expired entries are dropped
+    lazily: a min-heap of expiry times is swept on every ``put`` and lookups
+    ignore anything past its deadline.
+
+    Handlers are registered per ``await`` key; a single telebot message_handler
+    using ``waiting`` / ``dispatch`` serves all of them with one dict lookup
+    per incoming message.
+    """
+
+    def __init__(self, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._items: Dict[Key, Tuple[float, dict]] = {}
+        self._heap: List[Tuple[float, Key]] = []
+        self._handlers: Dict[str, Callable] = {}
+        self._lock = threading.Lock()
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def on(self, await_key: str):
+        def deco(fn):
+            self._handlers[await_key] = fn
+            return fn
+        return deco
+
+    def put(self, chat_id: int, user_id: int, ctx: dict):
+        """Wait for (chat, user)'s next message; replaces a prompt they already had open."""
+        now = self._clock()
+        deadline = now + self.ttl
+        with self._lock:
+            self._sweep(now)
+            self._items[(chat_id, user_id)] = (deadline, ctx)
+            heapq.heappush(self._heap, (deadline, (chat_id, user_id)))
+
+    def take(self, chat_id: int, user_id: int) -> Optional[dict]:
+        with self._lock:
+            hit = self._items.pop((chat_id, user_id), None)
+        if hit is None or hit[0] <= self._clock():
+            return None
+        return hit[1]
+
+    def waiting(self, m) -> bool:
+        """telebot message_handler predicate: does this message answer an open prompt?"""
+        user = m.from_user
+        if user is None:
+            return False
+        hit = self._items.get((m.chat.id, user.id))
+        return hit is not None and hit[0] > self._clock() and hit[1].get("await") in self._handlers
+
+    def dispatch(self, m) -> bool:
+        ctx = self.take(m.chat.id, m.from_user.id)
+        if ctx is None:
+            return False
+        fn = self._handlers.get(ctx.get("await"))
+        if fn is None:
+            return False
+        fn(m, ctx)
+        return True
+
+    def _sweep(self, now: float):
+        heap, items = self._heap, self._items
+        while heap and heap[0][0] <= now:
+            deadline, key = heapq.heappop(heap)
+            hit = items.get(key)
+            # a newer prompt for the same key has its own, later heap entry
+            if hit is not None and hit[0] == deadline:
+                del items[key]
+                self.expired += 1
@@ -0,0 +1,99 @@
+# modules/antispam_policy.py
+from __future__ import annotations
+from enum import IntEnum
+from typing import Optional, Tuple
+
+
+class Penalty(IntEnum):
+    OFF = 0
+    WARN = 1
+    KICK = 2
+    MUTE = 3
+    BAN = 4
+
+
+# forward / quote origin, used to index Policy.forwarding and Policy.quote
+CHANNELS, GROUPS, USERS, BOTS = range(4)
+SOURCES = ("channels", "groups", "users", "bots")
+
+_PENALTIES = {p.name.lower(): p for p in Penalty}
+
+# warns a user may collect (while none has lapsed) before the section's escalation applies.
+# Escalation is opt-in per section ("warn_escalate": "mute"/"ban"/"kick"); a plain Warn stays a warn.
+WARN_LIMIT = 3
+WARN_ESCALATE = "off"
+
+
+class Rule:
+    """What one section (or one forward/quote origin) does to an offending message."""
+    __slots__ = ("penalty", "delete", "secs", "warn_limit", "escalate", "escalate_secs")
+
+    def __init__(self, penalty: Penalty, delete: bool, secs: int, warn_limit: int = 0,
+                 escalate: Penalty = Penalty.OFF, escalate_secs: int = 0):
+        self.penalty = penalty
+        self.delete = delete
+        self.secs = secs  # duration of the chosen penalty; 0 = permanent / no expiry
+        # WARN rules only: the warn_limit-th active warn applies `escalate` instead (0 = never)
+        self.warn_limit = warn_limit
+        self.escalate = escalate
+        self.escalate_secs = escalate_secs
+
+    def __bool__(self):
+        return self.penalty is not Penalty.OFF or self.delete
+
+    def __repr__(self):
+        return f"Rule({self.penalty.name}, delete={self.delete}, secs={self.secs})"
+
+
+class Policy:
+    """Immutable, flattened view of a group's ``antispam_cfg`` for the per-message path.
+
+    A section that would do nothing is stored as ``None`` so callers can skip
+    it with a single truth test.
+    """
+    __slots__ = ("enabled", "tg_links", "username_antispam", "bots_antispam",
+                 "total_links", "forwarding", "quote", "dupes", "active")
+
+    def __init__(self, enabled: bool, tg_links: Optional[Rule], username_antispam: bool,
+                 bots_antispam: bool, total_links: Optional[Rule],
+                 forwarding: Tuple[Optional[Rule], ...], quote: Tuple[Optional[Rule], ...],
+                 dupes: Optional[Rule] = None):
+        set_ = object.__setattr__
+        set_(self, "enabled", enabled)
+        set_(self, "tg_links", tg_links)
+        set_(self, "username_antispam", username_antispam)
+        set_(self, "bots_antispam", bots_antispam)
+        set_(self, "total_links", total_links)
+        set_(self, "forwarding", forwarding)
+        set_(self, "quote", quote)
+        set_(self, "dupes", dupes)
+        set_(self, "active", enabled and bool(tg_links or total_links or dupes or any(forwarding) or any(quote)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Policy is immutable; recompile it from the config")
+
+
+def _rule(sec: dict) -> Optional[Rule]:
+    pen = _PENALTIES.get(sec.get("penalty", "off"), Penalty.OFF)
+    secs = int(sec.get(f"{pen.name.lower()}_secs", 0) or 0) if pen in (Penalty.WARN, Penalty.MUTE, Penalty.BAN) else 0
+    rule = Rule(pen, bool(sec.get("delete")), secs)
+    if pen is Penalty.WARN:
+        esc = _PENALTIES.get(sec.get("warn_escalate", WARN_ESCALATE), Penalty.OFF)
+        rule.warn_limit = int(sec.get("warn_limit", WARN_LIMIT) or 0) if esc is not Penalty.OFF else 0
+        rule.escalate = esc
+        rule.escalate_secs = int(sec.get(f"{esc.name.lower()}_secs", 0) or 0) if esc in (Penalty.MUTE, Penalty.BAN) else 0
+    return rule if rule else None
+
+
+def compile_policy(cfg: dict) -> Policy:
+    tg = cfg["tg_links"]
+    return Policy(
+        enabled=bool(cfg.get("enabled", True)),
+        tg_links=_rule(tg),
+        username_antispam=bool(tg.get("username_antispam")),
+        bots_antispam=bool(tg.get("bots_antispam")),
+        total_links=_rule(cfg["total_links"]),
+        forwarding=tuple(_rule(cfg["forwarding"][s]) for s in SOURCES),
+        quote=tuple(_rule(cfg["quote_block"][s]) for s in SOURCES),
+        dupes=_rule(cfg.get("dupes") or {}),
+    )
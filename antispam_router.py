@@ -0,0 +1,91 @@
+# modules/antispam_router.py
+from __future__ import annotations
+from typing import Callable, Dict, Optional, Tuple
+
+# callback_data layouts used by the antispam menus:
+#   menu:antispam:<gid>                      -> ("main", "open")
+#   as:back:<gid>                            -> ("back", "open")
+#   as:<section>:<gid>                       -> (section, "open")
+#   as:<section>:<action>:<gid>[:<arg>...]   -> (section, action), args
+PREFIXES = ("as:", "menu:antispam:")
+OPEN = "open"
+
+
+class Callback:
+    """One callback_data string, split once."""
+    __slots__ = ("section", "action", "gid", "args")
+
+    def __init__(self, section: str, action: str, gid: int, args: Tuple[str, ...] = ()):
+        self.section = section
+        self.action = action
+        self.gid = gid
+        self.args = args
+
+    def __repr__(self):
+        return f"Callback({self.section}:{self.action}, gid={self.gid}, args={self.args})"
+
+
+def _int(s: str) -> Optional[int]:
+    # chat ids are negative for groups; avoids raising ValueError for every action name
+    return int(s) if (s[1:] if s[:1] == "-" else s).isdecimal() else None
+
+
+def parse(data: Optional[str]) -> Optional[Callback]:
+    """Parse antispam callback_data; None if it isn't ours or is malformed."""
+    if not data:
+        return None
+    parts = data.split(":")
+    if len(parts) < 3:
+        return None
+    if parts[0] == "menu":
+        gid = _int(parts[2]) if parts[1] == "antispam" else None
+        return Callback("main", OPEN, gid) if gid is not None else None
+    if parts[0] != "as":
+        return None
+    gid = _int(parts[2])
+    if gid is not None:
+        return Callback(parts[1], OPEN, gid, tuple(parts[3:]))
+    if len(parts) < 4:
+        return None
+    gid = _int(parts[3])
+    if gid is None:
+        return None
+    return Callback(parts[1], parts[2], gid, tuple(parts[4:]))
+
+
+class Router:
+    """(section, action) -> handler table behind a single callback_query_handler.
+
+    Dispatch costs one split and one dict lookup however many menu entries
+    are registered, instead of telebot trying every handler's predicate in turn.
+    """
+
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], Callable] = {}
+
+    def __len__(self):
+        return len(self._routes)
+
+    def route(self, section: str, action: str = OPEN):
+        def deco(fn):
+            self._routes[(section, action)] = fn
+            return fn
+        return deco
+
+    def handles(self, data: Optional[str]) -> bool:
+        return bool(data) and data.startswith(PREFIXES)
+
+    def resolve(self, data: Optional[str]):
+        """(handler, Callback) for the data, or (None, None) if nothing is registered for it."""
+        cb = parse(data)
+        if cb is None:
+            return None, None
+        fn = self._routes.get((cb.section, cb.action))
+        return (fn, cb) if fn is not None else (None, None)
+
+    def dispatch(self, c) -> bool:
+        fn, cb = self.resolve(c.data)
+        if fn is None:
+            return False
+        fn(c, cb)
+        return True
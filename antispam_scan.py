@@ -0,0 +1,99 @@
+# modules/antispam_scan.py
+from __future__ import annotations
+import re
+from typing import Iterable, Optional, Set
+
+# category bits returned by scan_text() / scan_message()
+TG_LINK  = 1   # t.me / telegram.me / telegram.dog / tg:// link to a chat or user
+USERNAME = 2   # @username mention of a chat or user
+BOT_LINK = 4   # link or mention whose target is a bot (username ending in "bot")
+URL      = 8   # any link at all (Telegram links included)
+
+NAMES = {TG_LINK: "tg_link", USERNAME: "username", BOT_LINK: "bot_link", URL: "url"}
+
+# Bare domains (no scheme, no www.) only count with a lowercase TLD, so "end of sentence.It works"
+# stays plain text; TLDs that are also everyday words additionally need a path ("logged.in" doesn't
+# count, "shop.in/x" does).
+_TLDS = ("com|net|org|info|biz|io|ru|uk|xyz|ly|gg|tk|ml|ga|cf|gq|cc|tv|eu|fr|nl|pl|ua|kz|ir|tr|br|bd|"
+         "pk|vn|cn|jp|kr")
+_WORD_TLDS = ("in|it|me|co|us|de|es|id|top|site|online|club|shop|app|dev|link|live|store|click|fun|pro|"
+              "tech|space|website|vip|win|bet|cash|money")
+
+# one pass over the text; which named group matched tells the category
+_SCAN = re.compile(
+    r"(?P<tg>(?:https?://)?(?:www\.)?(?:t|telegram)\.(?:me|dog)/(?P<tgpath>[+\w]+)"
+    r"|tg://resolve\?domain=(?P<tgdom>\w+))"
+    r"|(?<![\w@])@(?P<uname>[A-Za-z]\w{3,31})\b"
+    r"|(?P<url>(?:https?|ftp)://\S+|www\.\S+"
+    r"|\b[a-z0-9](?:[a-z0-9-]*[a-z0-9])?(?:\.[a-z0-9-]+)*\."
+    rf"(?-i:(?:{_TLDS})\b(?:/\S*)?|(?:{_WORD_TLDS})/\S*))",
+    re.IGNORECASE,
+)
+
+# cheap pre-check: without one of these characters none of the patterns can match
+_TRIGGER_CHARS = frozenset(".@:")
+
+
+def _is_bot(name: Optional[str]) -> bool:
+    return bool(name) and name.lower().endswith("bot")
+
+
+def scan_text(text: Optional[str]) -> int:
+    if not text or _TRIGGER_CHARS.isdisjoint(text):
+        return 0
+    mask = 0
+    for m in _SCAN.finditer(text):
+        kind = m.lastgroup
+        if kind == "url":
+            mask |= URL
+        elif kind == "tg":
+            mask |= (BOT_LINK if _is_bot(m.group("tgpath") or m.group("tgdom")) else TG_LINK) | URL
+        else:
+            mask |= BOT_LINK if _is_bot(m.group("uname")) else USERNAME
+        if mask == TG_LINK | USERNAME | BOT_LINK | URL:
+            break
+    return mask
+
+
+def scan_entities(entities: Optional[Iterable], text: Optional[str] = None) -> int:
+    """Categories from Telegram message entities.
+
+    Mostly matters for ``text_link`` (the URL is not in the visible text) and
+    ``text_mention``; ``url``/``mention`` entities are found in the text anyway.
+    """
+    mask = 0
+    for e in entities or ():
+        t = e.type
+        if t == "text_link":
+            mask |= URL | scan_text(getattr(e, "url", None))
+        elif t == "url":
+            mask |= URL
+        elif t == "text_mention":
+            user = getattr(e, "user", None)
+            mask |= BOT_LINK if getattr(user, "is_bot", False) else USERNAME
+        elif t == "mention":
+            # offsets are UTF-16 code units; good enough to peek at an ASCII username
+            name = text[e.offset:e.offset + e.length] if text is not None else None
+            mask |= BOT_LINK if _is_bot(name) else USERNAME
+    return mask
+
+
+def scan_message(m) -> int:
+    """All link/username categories present in a telebot message (text or caption)."""
+    text = m.text if m.text is not None else getattr(m, "caption", None)
+    entities = m.entities if m.text is not None else getattr(m, "caption_entities", None)
+    mask = scan_text(text)
+    if entities:
+        mask |= scan_entities(entities, text)
+    return mask
+
+
+def categories(mask: int) -> Set[str]:
+    return {name for bit, name in NAMES.items() if mask & bit}
+
+
+def tg_links_hit(mask: int, username_antispam: bool, bots_antispam: bool) -> bool:
+    """Does a scan result trip the "Telegram links" section with these toggles?"""
+    return bool(mask & TG_LINK
+                or (username_antispam and mask & USERNAME)
+                or (bots_antispam and mask & BOT_LINK))
@@ -0,0 +1,237 @@
+# modules/antispam_store.py
+from __future__ import annotations
+import atexit
+import copy
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, MutableMapping, Optional, Tuple
+
+
+class _Draft(dict):
+    """Config being edited: a nested section is deep-copied the first time it is accessed.
+
+    Sections the edit never touches stay shared with the previous version, which
+    is safe because a stored section is never modified in place again.
+    """
+
+    def __init__(self, base: dict):
+        super().__init__(base)
+        self._copied: set = set()
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, dict) and key not in self._copied:
+            value = copy.deepcopy(value)
+            dict.__setitem__(self, key, value)
+            self._copied.add(key)
+        return value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+
+class ConfigStore:
+    """Versioned per-group view of one key (``antispam_cfg``) of GROUP_SETTINGS.
+
+    Every write gets a new version number from a process-wide, strictly
+    increasing clock, so anything derived from a config (compiled policies,
+    rendered menus) can be cached as ``(version, value)`` and invalidated by a
+    single integer comparison. Versions are in-memory only; a group nobody has
+    written to since startup is at version 0.
+
+    With a ``WriteBehind`` the key is read and written through it; otherwise
+    every write goes straight to ``settings``. Other keys of a group's record
+    are never touched either way.
+    """
+
+    def __init__(self, settings: MutableMapping, key: str = "antispam_cfg",
+                 write_behind: Optional["WriteBehind"] = None):
+        self.settings = settings
+        self.key = key
+        self.write_behind = write_behind
+        self._versions: Dict[int, int] = {}
+        self._clock = itertools.count(1)
+        self._lock = threading.Lock()  # telebot runs handlers on a thread pool
+
+    def get(self, gid: int) -> dict:
+        """Current config; treat it as read-only and change it through mutate()."""
+        if self.write_behind is not None:
+            return self.write_behind.get(gid)
+        return self.settings[gid][self.key]
+
+    def find(self, gid: int) -> Optional[dict]:
+        try:
+            return self.get(gid)
+        except KeyError:
+            return None
+
+    def version(self, gid: int) -> int:
+        return self._versions.get(gid, 0)
+
+    def replace(self, gid: int, cfg: dict) -> int:
+        with self._lock:
+            return self._write(gid, cfg)
+
+    def ensure(self, gid: int, fill: Callable[[Optional[dict]], Tuple[dict, bool]]) -> dict:
+        """Bring a group's config up to date: ``fill(current or None)`` -> ``(cfg, changed)``.
+
+        Runs under the store lock like mutate(), so a concurrent edit can't be
+        overwritten by a copy filled from an older version.
+        """
+        with self._lock:
+            cfg, changed = fill(self.find(gid))
+            if changed:
+                self._write(gid, cfg)
+            return cfg
+
+    def mutate(self, gid: int, fn: Callable[[dict], None]) -> dict:
+        with self._lock:
+            draft = _Draft(self.get(gid))
+            fn(draft)
+            cfg = dict(draft)
+            self._write(gid, cfg)
+            return cfg
+
+    def _write(self, gid: int, cfg: dict) -> int:
+        if self.write_behind is not None:
+            self.write_behind.put(gid, cfg)
+        else:
+            g2 = dict(self.settings[gid]); g2[self.key] = cfg
+            self.settings[gid] = g2
+        v = self._versions[gid] = next(self._clock)
+        return v
+
+
+# ------------- Write-behind persistence -------------
+class WriteBehind:
+    """Batches writes of one key (``antispam_cfg``) into a GROUP_SETTINGS-like mapping.
+
+    Reads of the key are served from an LRU of at most ``max_cached`` groups
+    (a group that fell out is read from ``settings`` again); this module is the
+    only writer of that key, so a cached copy can't go stale. Writes only mark
+    the group dirty, and dirty groups stay cached until flushed. Once
+    ``start()`` ran, a background thread flushes dirty groups every
+    ``interval`` seconds, or sooner once ``max_dirty`` pile up: each group's
+    record is read fresh, gets the new value of the key merged in, and all of
+    them are written as one batch, so keys other modules wrote in the meantime
+    are kept. Pending writes are also flushed at exit.
+
+    One batch is one transaction / sync of the backend: ``write_many(items)``
+    if it has one, else item assignment followed by a single ``commit()`` or
+    ``sync()`` (SqliteDict / shelve opened without autocommit / writeback);
+    a plain dict needs neither.
+    """
+
+    def __init__(self, settings: MutableMapping, key: str = "antispam_cfg",
+                 interval: float = 2.0, max_dirty: int = 256, max_cached: int = 4096):
+        self.settings = settings
+        self.key = key
+        self.interval = interval
+        self.max_dirty = max_dirty
+        self.max_cached = max_cached
+        self._mem: "OrderedDict[int, dict]" = OrderedDict()
+        self._dirty: set = set()
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.flushes = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="settings-flush", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def get(self, gid):
+        with self._lock:
+            try:
+                value = self._mem[gid]
+                self._mem.move_to_end(gid)
+                return value
+            except KeyError:
+                value = self._mem[gid] = self.settings[gid][self.key]
+                self._evict()
+                return value
+
+    def put(self, gid, value):
+        with self._lock:
+            self._mem[gid] = value
+            self._mem.move_to_end(gid)
+            self._dirty.add(gid)
+            self._evict()
+            if len(self._dirty) >= self.max_dirty:
+                self._wake.set()
+
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                dirty = {gid: self._mem[gid] for gid in self._dirty}
+                self._dirty.clear()
+            try:
+                items = []
+                for gid, value in dirty.items():
+                    record = dict(self.settings.get(gid) or {})
+                    record[self.key] = value
+                    items.append((gid, record))
+                self._write_batch(items)
+            except Exception:
+                with self._lock:
+                    self._dirty.update(dirty)  # retry on the next round
+                raise
+            with self._lock:
+                self._evict()
+            self.flushes += 1
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def _write_batch(self, items):
+        write_many = getattr(self.settings, "write_many", None)
+        if write_many is not None:
+            write_many(items)
+            return
+        for gid, record in items:
+            self.settings[gid] = record
+        for name in ("commit", "sync"):
+            done = getattr(self.settings, name, None)
+            if callable(done):
+                done()
+                return
+
+    def _evict(self):
+        # oldest clean groups first; dirty ones are needed by the next flush
+        excess = len(self._mem) - self.max_cached
+        if excess <= 0:
+            return
+        drop = []
+        for gid in self._mem:
+            if gid not in self._dirty:
+                drop.append(gid)
+                if len(drop) == excess:
+                    break
+        for gid in drop:
+            del self._mem[gid]
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass  # backend hiccup; the groups stay dirty and are retried
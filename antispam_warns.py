@@ -0,0 +1,105 @@
+# modules/antispam_warns.py
+from __future__ import annotations
+import threading
+import time
+from array import array
+from typing import Callable, Dict, List
+
+FOREVER = 0xFFFFFFFF  # "until" of warns that never lapse (warn duration set to Off)
+_MAX_COUNT = 0xFF
+
+
+class WarnLedger:
+    """Active warn count per (chat, user), stored in two flat arrays.
+
+    Each tracked user is one slot: a 1-byte count and a 4-byte epoch second at
+    which the whole count lapses (every new warn pushes it to now + warn_secs).
+    Warning and reading are O(1); a lapsed count reads as 0 without any
+    bookkeeping. ``compact`` drops lapsed users and, once at least half the
+    slots are free, packs the arrays again.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self._slots: Dict[int, Dict[int, int]] = {}  # chat_id -> user_id -> slot
+        self._count = array("B")
+        self._until = array("I")
+        self._free: List[int] = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._count) - len(self._free)
+
+    def warn(self, chat_id: int, user_id: int, secs: int) -> int:
+        """Add one warn that keeps the count alive for ``secs`` (0 = forever); returns the new count."""
+        now = int(self._clock())
+        until = now + secs if secs else FOREVER
+        with self._lock:
+            users = self._slots.get(chat_id)
+            if users is None:
+                users = self._slots[chat_id] = {}
+            slot = users.get(user_id)
+            if slot is None:
+                slot = users[user_id] = self._alloc()
+                n = 1
+            else:
+                n = self._count[slot] + 1 if self._until[slot] > now else 1
+            n = min(n, _MAX_COUNT)
+            self._count[slot] = n
+            self._until[slot] = until if n == 1 else max(until, self._until[slot])
+            return n
+
+    def count(self, chat_id: int, user_id: int) -> int:
+        now = self._clock()
+        with self._lock:  # compact() may renumber slots
+            slot = self._slots.get(chat_id, {}).get(user_id)
+            if slot is None or self._until[slot] <= now:
+                return 0
+            return self._count[slot]
+
+    def clear(self, chat_id: int, user_id: int):
+        with self._lock:
+            users = self._slots.get(chat_id)
+            slot = users.pop(user_id, None) if users else None
+            if slot is not None:
+                self._release(slot)
+                if not users:
+                    del self._slots[chat_id]
+
+    def compact(self) -> int:
+        """Forget users whose warns have lapsed; returns how many were dropped."""
+        now = self._clock()
+        dropped = 0
+        with self._lock:
+            until = self._until
+            for chat_id in list(self._slots):
+                users = self._slots[chat_id]
+                for user_id in [u for u, s in users.items() if until[s] <= now]:
+                    self._release(users.pop(user_id))
+                    dropped += 1
+                if not users:
+                    del self._slots[chat_id]
+            if self._free and len(self._free) * 2 >= len(self._count):
+                self._repack()
+        return dropped
+
+    def _alloc(self) -> int:
+        if self._free:
+            return self._free.pop()
+        self._count.append(0)
+        self._until.append(0)
+        return len(self._count) - 1
+
+    def _release(self, slot: int):
+        self._count[slot] = 0
+        self._until[slot] = 0
+        self._free.append(slot)
+
+    def _repack(self):
+        count, until = array("B"), array("I")
+        for users in self._slots.values():
+            for user_id, slot in users.items():
+                users[user_id] = len(count)
+                count.append(self._count[slot])
+                until.append(self._until[slot])
+        self._count, self._until, self._free = count, until, []
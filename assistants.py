@@ -0,0 +1,135 @@
+# assistants.py
+from __future__ import annotations
+import asyncio
+import re
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+def session_strings(env: dict) -> List[str]:
+    """SESSION_STRINGS (whitespace/comma separated) plus the single SESSION_STRING, deduplicated."""
+    raw = env.get("SESSION_STRINGS", "") + " " + env.get("SESSION_STRING", "")
+    out = []
+    for s in re.split(r"[\s,]+", raw):
+        if s and s not in out:
+            out.append(s)
+    return out
+
+
+class Assistant:
+    __slots__ = ("name", "client", "calls", "chats", "alive")
+
+    def __init__(self, name: str, client, calls):
+        self.name = name
+        self.client = client
+        self.calls = calls
+        self.chats: set = set()
+        self.alive = True
+
+
+class NoAssistant(Exception):
+    pass
+
+
+class AssistantPool:
+    """Spreads group calls over several assistant accounts.
+
+    A chat sticks to the assistant that joined it; new chats go to the alive
+    assistant with the fewest calls. When an assistant drops, its chats are
+    unassigned and ``on_drop`` is told about them so they can be rejoined
+    elsewhere. The pool exposes the PyTgCalls call methods, routing each to
+    the chat's assistant, so it can stand in for a single ``PyTgCalls``.
+    """
+
+    def __init__(self, assistants: Iterable[Assistant],
+                 on_drop: Optional[Callable[[List[int]], None]] = None):
+        self.assistants: List[Assistant] = list(assistants)
+        self.on_drop = on_drop
+        self._by_chat: Dict[int, Assistant] = {}
+
+    def __len__(self):
+        return len(self.assistants)
+
+    def assigned(self, chat_id: int) -> Optional[Assistant]:
+        return self._by_chat.get(chat_id)
+
+    def for_chat(self, chat_id: int) -> Assistant:
+        a = self._by_chat.get(chat_id)
+        if a is not None and a.alive:
+            return a
+        alive = [x for x in self.assistants if x.alive]
+        if not alive:
+            raise NoAssistant("no assistant is connected")
+        a = min(alive, key=lambda x: len(x.chats))
+        self._assign(chat_id, a)
+        return a
+
+    def release(self, chat_id: int):
+        a = self._by_chat.pop(chat_id, None)
+        if a is not None:
+            a.chats.discard(chat_id)
+
+    def mark_down(self, a: Assistant):
+        if not a.alive:
+            return
+        a.alive = False
+        orphans = list(a.chats)
+        for chat_id in orphans:
+            self.release(chat_id)
+        if orphans and self.on_drop is not None:
+            self.on_drop(orphans)
+
+    def mark_up(self, a: Assistant):
+        a.alive = True
+
+    def load(self) -> Dict[str, int]:
+        return {a.name: len(a.chats) for a in self.assistants if a.alive}
+
+    def _assign(self, chat_id: int, a: Assistant):
+        self.release(chat_id)
+        self._by_chat[chat_id] = a
+        a.chats.add(chat_id)
+
+    async def watch(self, interval: float = 15.0):
+        """Poll ``client.is_connected`` and mark assistants down/up accordingly."""
+        while True:
+            await asyncio.sleep(interval)
+            for a in self.assistants:
+                connected = getattr(a.client, "is_connected", True)
+                if a.alive and not connected:
+                    self.mark_down(a)
+                elif not a.alive and connected:
+                    self.mark_up(a)
+
+    # ------------- PyTgCalls facade -------------
+    async def join_group_call(self, chat_id: int, stream):
+        a = self.for_chat(chat_id)
+        try:
+            await a.calls.join_group_call(chat_id, stream)
+        except Exception:
+            self.release(chat_id)
+            raise
+
+    async def change_stream(self, chat_id: int, stream):
+        await self._on(chat_id).calls.change_stream(chat_id, stream)
+
+    async def pause_stream(self, chat_id: int):
+        await self._on(chat_id).calls.pause_stream(chat_id)
+
+    async def resume_stream(self, chat_id: int):
+        await self._on(chat_id).calls.resume_stream(chat_id)
+
+    async def leave_group_call(self, chat_id: int):
+        a = self._by_chat.get(chat_id)
+        if a is None:
+            return
+        try:
+            await a.calls.leave_group_call(chat_id)
+        finally:
+            self.release(chat_id)
+
+    def _on(self, chat_id: int) -> Assistant:
+        a = self._by_chat.get(chat_id)
+        if a is None or not a.alive:
+            # VoiceSessions treats this like a vanished call and rejoins
+            raise NoAssistant(f"chat {chat_id} has no live assistant")
+        return a
@@ -0,0 +1,130 @@
+# audio_cache.py
+from __future__ import annotations
+import os
+import re
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+_SAFE = re.compile(r"[^\w-]")
+
+
+class AudioCache:
+    """Size-bounded LRU cache of transcoded Opus files for frequently played tracks.
+
+    A track is fetched once it has been requested ``hot_after`` times; the
+    transcode is written to a ``.part`` file and renamed into place, so a
+    reader never sees a half-written file. Least recently played files are
+    removed once the directory grows past ``max_bytes``.
+    """
+
+    EXT = ".opus"
+
+    def __init__(self, root: str, max_bytes: int = 2 * 1024**3, hot_after: int = 2,
+                 max_duration: int = 15 * 60, bitrate: str = "96k", workers: int = 2):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hot_after = hot_after
+        self.max_duration = max_duration
+        self.bitrate = bitrate
+        self._lock = threading.Lock()
+        self._files: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        self._plays: Dict[str, int] = {}
+        self._busy: set = set()
+        self._size = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audiocache")
+        os.makedirs(root, exist_ok=True)
+        self._scan()
+
+    @staticmethod
+    def key(info: dict) -> Optional[str]:
+        if not info.get("id"):
+            return None
+        return _SAFE.sub("_", f"{info.get('extractor_key', 'x')}-{info['id']}")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key + self.EXT)
+
+    def _scan(self):
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.endswith(".part"):
+                try: os.remove(path)
+                except OSError: pass
+                continue
+            if not name.endswith(self.EXT):
+                continue
+            st = os.stat(path)
+            entries.append((st.st_mtime, name[:-len(self.EXT)], st.st_size))
+        for _, key, size in sorted(entries):
+            self._files[key] = size
+            self._size += size
+        self._evict()
+
+    def lookup(self, info: dict) -> Optional[str]:
+        """Local file for ``info`` if cached; also counts the play towards caching it."""
+        key = self.key(info)
+        if key is None:
+            return None
+        with self._lock:
+            if key in self._files:
+                self._files.move_to_end(key)
+                path = self._path(key)
+                try: os.utime(path)  # keeps LRU order across restarts
+                except OSError:
+                    self._size -= self._files.pop(key)
+                    return None
+                return path
+            if len(self._plays) >= 50_000:
+                self._plays.clear()  # crude, but keeps the play counter bounded
+            n = self._plays[key] = self._plays.get(key, 0) + 1
+            if n < self.hot_after or key in self._busy:
+                return None
+            if info.get("duration") and info["duration"] > self.max_duration:
+                return None
+            self._busy.add(key)
+        self._pool.submit(self._fetch, key, info)
+        return None
+
+    def _fetch(self, key: str, info: dict):
+        final = self._path(key)
+        tmp = final + ".part"
+        cmd = ["ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-y"]
+        headers = info.get("http_headers")
+        if headers:
+            cmd += ["-headers", "".join(f"{k}: {v}\r\n" for k, v in headers.items())]
+        cmd += ["-i", info["url"], "-vn", "-c:a", "libopus", "-b:a", self.bitrate, "-f", "ogg", tmp]
+        try:
+            subprocess.run(cmd, check=True, timeout=600,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            os.replace(tmp, final)
+            size = os.path.getsize(final)
+        except (OSError, subprocess.SubprocessError):
+            try: os.remove(tmp)
+            except OSError: pass
+            with self._lock:
+                self._busy.discard(key)
+            return
+        with self._lock:
+            self._busy.discard(key)
+            self._plays.pop(key, None)
+            self._files[key] = size
+            self._size += size
+            self._evict()
+
+    def _evict(self):
+        while self._size > self.max_bytes and len(self._files) > 1:
+            key, size = self._files.popitem(last=False)
+            self._size -= size
+            try: os.remove(self._path(key))
+            except OSError: pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"files": len(self._files), "bytes": self._size, "fetching": len(self._busy)}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
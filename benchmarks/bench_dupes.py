@@ -0,0 +1,63 @@
+# benchmarks/bench_dupes.py
+"""Latency of copy-paste wave detection (antispam_dupes.WaveDetector.check).
+
+Replays ordinary group chatter with a raid mixed in (one spam text posted by
+many accounts with small edits) through a single group's window and reports
+per-message check latency and how many raid / normal messages were flagged.
+
+    python benchmarks/bench_dupes.py --messages 20000 --raid 0.1
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from antispam_dupes import WaveDetector  # noqa: E402
+
+WORDS = ("the a to and of you we is it this that for on with are was be have not they what "
+         "song play next please thanks lol ok good night morning today tomorrow bari jabo kotha "
+         "hobe ekhon pore meeting pinned message version update link group music").split()
+RAID = "Join our VIP crypto signals group now! {n}x guaranteed profits, DM @pumpking {tail}"
+TAILS = ("🔥", "🚀🚀", "today", "fast!!", "", "limited seats", "✅✅✅")
+
+
+def traffic(n, raid_ratio, seed=1):
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        if rnd.random() < raid_ratio:
+            out.append((True, 10_000 + i, RAID.format(n=rnd.randint(10, 999), tail=rnd.choice(TAILS))))
+        else:
+            out.append((False, rnd.randrange(500), " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(4, 30)))))
+    return out
+
+
+def main(args):
+    msgs = traffic(args.messages, args.raid)
+    det = WaveDetector(per_group=args.window)
+    flagged = {True: 0, False: 0}
+    total = {True: 0, False: 0}
+    lat = []
+    for i, (is_raid, user, text) in enumerate(msgs):
+        t0 = time.perf_counter()
+        hits = det.check(-1001, user, i, text)
+        lat.append(time.perf_counter() - t0)
+        total[is_raid] += 1
+        flagged[is_raid] += any(m == i for _, m in hits)
+    lat.sort()
+    q = lambda p: lat[min(len(lat) - 1, int(p * len(lat)))] * 1e6  # noqa: E731
+    print(f"{len(msgs)} messages, window {args.window}, raid ratio {args.raid:.0%}")
+    print(f"check latency: p50 {q(0.5):.0f} µs  p99 {q(0.99):.0f} µs  max {lat[-1] * 1e6:.0f} µs")
+    print(f"raid messages flagged: {flagged[True]}/{total[True]}   normal flagged: {flagged[False]}/{total[False]}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--messages", type=int, default=20_000)
+    ap.add_argument("--raid", type=float, default=0.1)
+    ap.add_argument("--window", type=int, default=200)
+    main(ap.parse_args())
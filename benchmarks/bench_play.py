@@ -0,0 +1,152 @@
+# benchmarks/bench_play.py
+"""Offline load benchmark for the /play and /stop handlers in bot.py.
+
+yt-dlp and PyTgCalls are replaced by stand-ins with configurable latency, so
+this runs without network or Telegram credentials (bot.py's own imports still
+need to be installed). For each chat count it sends, per chat, a /play that
+starts a track, a /play that gets queued and a /stop, all concurrently, and
+reports throughput, command latency percentiles and event-loop lag.
+
+    python benchmarks/bench_play.py --chats 10 100 1000 --extract-ms 50 --join-ms 30
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot  # noqa: E402
+import resolver  # noqa: E402
+from assistants import Assistant  # noqa: E402
+from outbound import Limiter  # noqa: E402
+
+
+class FakeYoutubeDL:
+    latency = 0.05
+
+    def __init__(self, opts):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def extract_info(self, query, download=False):
+        time.sleep(self.latency)  # runs in the resolver's worker threads, like the real thing
+        vid = str(abs(hash(query)))[:11]
+        return {"id": vid, "extractor_key": "Youtube", "title": query,
+                "url": f"https://example.googlevideo.com/videoplayback?id={vid}&expire={int(time.time()) + 21600}"}
+
+
+class FakeCalls:
+    def __init__(self, join: float, switch: float):
+        self.join, self.switch = join, switch
+
+    async def join_group_call(self, chat_id, stream):
+        await asyncio.sleep(self.join)
+
+    async def change_stream(self, chat_id, stream):
+        await asyncio.sleep(self.switch)
+
+    async def pause_stream(self, chat_id):
+        await asyncio.sleep(self.switch)
+
+    async def resume_stream(self, chat_id):
+        await asyncio.sleep(self.switch)
+
+    async def leave_group_call(self, chat_id):
+        await asyncio.sleep(self.join)
+
+
+class _Chat:
+    __slots__ = ("id",)
+
+    def __init__(self, chat_id):
+        self.id = chat_id
+
+
+class FakeMessage:
+    __slots__ = ("text", "chat")
+
+    def __init__(self, chat_id, text):
+        self.text = text
+        self.chat = _Chat(chat_id)
+
+    async def reply_text(self, text, **kwargs):
+        pass
+
+
+def pct(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+async def loop_lag(samples, stop: asyncio.Event, interval=0.005):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - t0 - interval)
+
+
+async def timed(lat, coro):
+    t0 = time.perf_counter()
+    await coro
+    lat.append(time.perf_counter() - t0)
+
+
+async def run(chats: int, tag: str):
+    play_lat, stop_lat, lag = [], [], []
+    done = asyncio.Event()
+    monitor = asyncio.ensure_future(loop_lag(lag, done))
+
+    async def session(chat_id):
+        await timed(play_lat, bot.play(None, FakeMessage(chat_id, f"/play {tag} song {chat_id}")))
+        await timed(play_lat, bot.play(None, FakeMessage(chat_id, f"/play {tag} next {chat_id}")))
+        await timed(stop_lat, bot.stop(None, FakeMessage(chat_id, "/stop")))
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(session(-1000000 - i) for i in range(chats)))
+    wall = time.perf_counter() - t0
+    done.set()
+    await monitor
+
+    ms = lambda v: f"{v * 1000:8.1f}"
+    cmds = len(play_lat) + len(stop_lat)
+    print(f"{chats:>6} {cmds / wall:>9.1f}"
+          f" {ms(pct(play_lat, 50))} {ms(pct(play_lat, 95))} {ms(pct(play_lat, 99))}"
+          f" {ms(pct(stop_lat, 50))} {ms(pct(stop_lat, 99))}"
+          f" {ms(pct(lag, 50))} {ms(pct(lag, 99))} {ms(max(lag, default=0))}")
+
+
+async def main(args):
+    FakeYoutubeDL.latency = args.extract_ms / 1000
+    resolver.YoutubeDL = FakeYoutubeDL
+    if not args.telegram_limits:
+        # the stand-ins don't rate-limit, so by default measure our own overhead, not Telegram's ceilings
+        bot.outbound.limiter = Limiter(1e9, 1e9, 1e9, 1e9)
+    bot.calls.assistants[:] = [Assistant("bench", None, FakeCalls(args.join_ms / 1000, args.switch_ms / 1000))]
+
+    print(f"extract={args.extract_ms}ms join={args.join_ms}ms switch={args.switch_ms}ms "
+          f"resolver_workers={bot.RESOLVER_WORKERS}")
+    print(f"{'chats':>6} {'cmd/s':>9} {'play p50':>8} {'p95':>8} {'p99':>8}"
+          f" {'stop p50':>8} {'p99':>8} {'lag p50':>8} {'p99':>8} {'max':>8}   (ms)")
+    for i, n in enumerate(args.chats):
+        await run(n, f"r{i}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--chats", type=int, nargs="+", default=[10, 100, 1000])
+    ap.add_argument("--extract-ms", type=float, default=50.0)
+    ap.add_argument("--join-ms", type=float, default=30.0)
+    ap.add_argument("--switch-ms", type=float, default=5.0)
+    ap.add_argument("--telegram-limits", action="store_true",
+                    help="keep the outbound scheduler's real Telegram rate limits")
+    asyncio.run(main(ap.parse_args()))
@@ -0,0 +1,88 @@
+# benchmarks/bench_warn_ledger.py
+"""Memory and speed of antispam_warns.WarnLedger vs a dict of warn-timestamp lists.
+
+Tracks N users spread over a few large groups, each with a couple of warns,
+and reports bytes per tracked user (tracemalloc) for both layouts, plus warn()
+throughput and the cost of a compaction pass that drops half of them.
+
+    python benchmarks/bench_warn_ledger.py --users 100000
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from antispam_warns import WarnLedger  # noqa: E402
+
+
+def users(n, groups, seed=1):
+    rnd = random.Random(seed)
+    chats = [-1001000000000 - i for i in range(groups)]
+    return [(rnd.choice(chats), 100_000_000 + rnd.randrange(7_000_000_000)) for _ in range(n)]
+
+
+def measure(build):
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return obj, used
+
+
+def naive(pairs, warns):
+    d = {}
+    now = time.time()
+    for chat, user in pairs:
+        for _ in range(warns):
+            d.setdefault((chat, user), []).append(now)
+    return d
+
+
+def ledger(pairs, warns, clock=time.time):
+    w = WarnLedger(clock=clock)
+    for chat, user in pairs:
+        for _ in range(warns):
+            w.warn(chat, user, 1800)
+    return w
+
+
+def main(args):
+    pairs = list(dict.fromkeys(users(args.users, args.groups)))
+    n = len(pairs)
+    _, naive_bytes = measure(lambda: naive(pairs, args.warns))
+    led, led_bytes = measure(lambda: ledger(pairs, args.warns))
+    print(f"{n:,} users in {args.groups} groups, {args.warns} warns each")
+    print(f"  dict of lists : {naive_bytes / 1024**2:7.1f} MiB  ({naive_bytes / n:6.0f} B/user)")
+    print(f"  WarnLedger    : {led_bytes / 1024**2:7.1f} MiB  ({led_bytes / n:6.0f} B/user)"
+          f"  = {led_bytes / n * 100_000 / 1024**2:.1f} MiB per 100k users")
+
+    t0 = time.perf_counter()
+    for chat, user in pairs:
+        led.warn(chat, user, 1800)
+    dt = time.perf_counter() - t0
+    print(f"  warn()        : {n / dt:,.0f} ops/s")
+
+    # half the users' warns lapse, then one compaction pass
+    now = [time.time()]
+    w = ledger(pairs, 1, clock=lambda: now[0])
+    for chat, user in pairs[::2]:
+        w.warn(chat, user, 7200)
+    now[0] += 3600
+    t0 = time.perf_counter()
+    dropped = w.compact()
+    print(f"  compact()     : dropped {dropped:,} of {n:,} in {(time.perf_counter() - t0) * 1000:.0f} ms, "
+          f"{len(w):,} left")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--users", type=int, default=100_000)
+    ap.add_argument("--groups", type=int, default=20)
+    ap.add_argument("--warns", type=int, default=2)
+    main(ap.parse_args())
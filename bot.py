@@ -1,15 +1,35 @@
-from pyrogram import Client, filters
-from pytgcalls import PyTgCalls
-from pytgcalls.types.input_stream import AudioPiped
-from yt_dlp import YoutubeDL
+import time
+_T0 = time.perf_counter()  # startup time এখান থেকে গোনা হয়
+
+from pyrogram import Client, filters, idle
 import asyncio
+import os
+
+from assistants import Assistant, AssistantPool, session_strings
+from resolver import Resolver, ResolveError, is_playlist
+from audio_cache import AudioCache
+from decoders import DecoderPool, DecoderBusy, SAMPLE_RATE
+from metrics import REGISTRY, STAGES, ERRORS, Gauge
+from outbound import AsyncOutbound
+from player import Player
+from voice import VoiceSessions
 
 API_ID = 123456  # তোমার API_ID
 API_HASH = "your_api_hash"  # তোমার API_HASH
 BOT_TOKEN = "your_bot_token"  # তোমার বট টোকেন
 
 app = Client("my_bot", api_id=API_ID, api_hash=API_HASH, bot_token=BOT_TOKEN)
-pytgcalls = PyTgCalls(app)
+
+# SESSION_STRINGS এ একাধিক assistant দিলে group call গুলো তাদের মধ্যে ভাগ হবে
+SESSIONS = session_strings(os.environ)
+
+def _assistant_dropped(chat_ids):
+    for chat_id in chat_ids:
+        voice.forget(chat_id)
+        asyncio.ensure_future(player.restart(chat_id))
+
+# assistants are added in setup_assistants(), so pytgcalls is only imported when the bot actually starts
+calls = AssistantPool([], on_drop=_assistant_dropped)
 
 ydl_opts = {
     'format': 'bestaudio/best',
@@ -20,29 +40,165 @@ ydl_opts = {
     'source_address': '0.0.0.0',
 }
 
+RESOLVER_WORKERS = 4  # একসাথে কয়টা yt-dlp extraction চলবে
+RESOLVE_TIMEOUT = 20  # seconds
+VOICE_IDLE_TIMEOUT = 180  # কিছু না বাজলে কত সেকেন্ড পর voice chat ছাড়বে
+AUDIO_CACHE_DIR = os.environ.get("AUDIO_CACHE_DIR")  # খালি রাখলে local audio cache বন্ধ
+AUDIO_CACHE_MB = int(os.environ.get("AUDIO_CACHE_MB", 2048))
+DECODER_POOL = os.environ.get("DECODER_POOL") == "1"  # আগে থেকে চালু ffmpeg decoder ব্যবহার করবে
+DECODER_WARM = int(os.environ.get("DECODER_WARM", 2))
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 9100))  # 0 দিলে Prometheus endpoint বন্ধ
+ADMIN_IDS = [int(x) for x in os.environ.get("ADMIN_IDS", "").replace(",", " ").split()]
+
+resolver = Resolver(ydl_opts, max_workers=RESOLVER_WORKERS, timeout=RESOLVE_TIMEOUT)
+decoders = DecoderPool(warm=DECODER_WARM) if DECODER_POOL else None
+
+def _call_closed(chat_id):
+    calls.release(chat_id)
+    if decoders is not None:
+        decoders.release(chat_id)
+
+# replies and voice-chat calls share one flood-wait aware, rate-limited sender
+outbound = AsyncOutbound()
+voice = VoiceSessions(calls, idle_timeout=VOICE_IDLE_TIMEOUT, on_leave=_call_closed, outbound=outbound)
+audio_cache = AudioCache(AUDIO_CACHE_DIR, max_bytes=AUDIO_CACHE_MB * 1024**2) if AUDIO_CACHE_DIR else None
+
+def make_stream(chat_id, source, headers=None):
+    from pytgcalls.types.input_stream import AudioPiped, AudioParameters, InputAudioStream, InputStream
+    if decoders is None:
+        return AudioPiped(source, headers=headers)
+    fifo = decoders.acquire(chat_id, source, headers)
+    return InputStream(InputAudioStream(fifo, AudioParameters(bitrate=SAMPLE_RATE)))
+
+player = Player(voice, resolver, make_stream, cache=audio_cache)
+
+REGISTRY.add(Gauge("musicbot_active_calls", "Group calls currently joined", lambda: len(voice)))
+REGISTRY.add(Gauge("musicbot_queued_tracks", "Tracks waiting in all chat queues", player.queued))
+REGISTRY.add(Gauge("musicbot_resolver_cache", "Resolved-URL cache counters",
+                   lambda: {**resolver.cache.stats(), "coalesced": resolver.coalesced}))
+REGISTRY.add(Gauge("musicbot_assistant_calls", "Calls per live assistant", calls.load, label="assistant"))
+if decoders is not None:
+    REGISTRY.add(Gauge("musicbot_decoders", "Decoder pool processes", decoders.stats))
+REGISTRY.add(Gauge("musicbot_outbound", "Outbound API scheduler counters", outbound.limiter.stats))
+STARTUP = {}
+REGISTRY.add(Gauge("musicbot_startup_seconds", "Time spent in each startup phase", lambda: STARTUP,
+                   label="phase"))
+
+def setup_assistants():
+    from pytgcalls import PyTgCalls
+    if SESSIONS:
+        clients = [Client(f"assistant{i}", api_id=API_ID, api_hash=API_HASH, session_string=s)
+                   for i, s in enumerate(SESSIONS)]
+        assistants = [Assistant(f"assistant{i}", c, PyTgCalls(c)) for i, c in enumerate(clients)]
+    else:
+        assistants = [Assistant("bot", app, PyTgCalls(app))]
+    for a in assistants:
+        a.calls.on_stream_end()(stream_end)
+        a.calls.on_kicked()(call_gone)
+        a.calls.on_closed_voice_chat()(call_gone)
+        a.calls.on_left()(call_gone)
+        calls.assistants.append(a)
+
 async def start():
+    STARTUP["imports"] = round(time.perf_counter() - _T0, 3)
+    # yt-dlp loads its extractors on a resolver thread while we log in
+    resolver.warm()
+    setup_assistants()
     await app.start()
-    await pytgcalls.start()
-    print("Bot started")
+    await asyncio.gather(*(a.client.start() for a in calls.assistants if a.client is not app))
+    await asyncio.gather(*(a.calls.start() for a in calls.assistants))
+    asyncio.ensure_future(calls.watch())
+    if decoders is not None:
+        await decoders.start()
+    if METRICS_PORT:
+        await REGISTRY.serve("127.0.0.1", METRICS_PORT)
+    STARTUP["total"] = round(time.perf_counter() - _T0, 3)
+    print(f"Bot started in {STARTUP['total'] * 1000:.0f} ms (imports {STARTUP['imports'] * 1000:.0f} ms)")
+
+async def shutdown():
+    if decoders is not None:
+        await decoders.close()
+    resolver.shutdown()
+    if audio_cache is not None:
+        audio_cache.shutdown()
+    for a in calls.assistants:
+        if a.client is not app:
+            await a.client.stop()
+    await app.stop()
+
+async def main():
+    await start()
+    await idle()
+    await shutdown()
+
+async def reply(message, text):
+    return await outbound.call(message.reply_text, text, _chat=message.chat.id)
 
 @app.on_message(filters.command("play") & filters.private)
 async def play(_, message):
-    url = message.text.split(None, 1)[1]
-    with YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(url, download=False)
-        url2 = info['url']
+    t0 = time.perf_counter()
+    with STAGES.time("parse"):
+        parts = message.text.split(None, 1)
+    if len(parts) < 2:
+        await reply(message, "Usage: /play <song name or link>")
+        return
+    query = parts[1]
+    try:
+        if is_playlist(query):
+            pos = await player.enqueue_playlist(message.chat.id, query)
+        else:
+            pos = await player.enqueue(message.chat.id, query)
+    except ResolveError as e:
+        ERRORS.inc("resolve")
+        await reply(message, f"Couldn't play that: {e}")
+        return
+    except DecoderBusy:
+        ERRORS.inc("decoder_busy")
+        await reply(message, "Too many songs playing right now, try again in a bit.")
+        return
+    except Exception:
+        ERRORS.inc("join")
+        raise
+    with STAGES.time("reply"):
+        if pos == 0:
+            await reply(message, "Playing now!")
+        else:
+            await reply(message, f"Queued at #{pos}")
+    STAGES.observe("total", time.perf_counter() - t0)
 
-    await pytgcalls.join_group_call(
-        message.chat.id,
-        AudioPiped(url2),
-    )
-    await message.reply_text("Playing now!")
+@app.on_message(filters.command("skip") & filters.private)
+async def skip(_, message):
+    track = await player.skip(message.chat.id)
+    await reply(message, f"Now playing: {track.title}" if track else "Queue finished!")
 
 @app.on_message(filters.command("stop") & filters.private)
 async def stop(_, message):
-    await pytgcalls.leave_group_call(message.chat.id)
-    await message.reply_text("Stopped!")
+    await player.stop(message.chat.id)
+    await reply(message, "Stopped!")
+
+@app.on_message(filters.command("stats") & filters.user(ADMIN_IDS))
+async def stats(_, message):
+    lines = ["<b>/play latency</b> (p50 / p95 / p99)"]
+    for stage in sorted(STAGES.series()):
+        q = [STAGES.quantile(stage, p) for p in (0.5, 0.95, 0.99)]
+        lines.append(f"{stage}: " + " / ".join(f"≤{v:g}s" for v in q))
+    c = resolver.cache.stats()
+    lines += [
+        "",
+        f"Active calls: {len(voice)}  Queued: {player.queued()}",
+        f"URL cache: {c['hits']} hits / {c['misses']} misses, {resolver.coalesced} coalesced",
+        f"Assistants: {calls.load()}",
+        f"Errors: {ERRORS.snapshot() or 'none'}",
+    ]
+    await reply(message, "\n".join(lines))
+
+async def stream_end(_, update):
+    await player.on_stream_end(update.chat_id)
+
+async def call_gone(_, chat_id):
+    voice.forget(chat_id)
+    player.drop(chat_id)
 
 if __name__ == "__main__":
-    asyncio.run(start())
-    app.run()
+    # one event loop for everything: Client.run drives main() on the loop the client was built on
+    app.run(main())
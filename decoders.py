@@ -0,0 +1,191 @@
+# decoders.py
+from __future__ import annotations
+import asyncio
+import itertools
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+# raw PCM the voice call consumes
+SAMPLE_RATE = 48000
+CHANNELS = 2
+
+
+class DecoderBusy(Exception):
+    pass
+
+
+class _Worker:
+    __slots__ = ("proc", "fifo", "spawned")
+
+    def __init__(self, proc: subprocess.Popen, fifo: str):
+        self.proc = proc
+        self.fifo = fifo
+        self.spawned = time.monotonic()
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+
+class DecoderPool:
+    """Pre-spawned ffmpeg decoders so a track start doesn't pay for process startup.
+
+    Each worker is an ffmpeg already running with ``-i pipe:0`` and a named FIFO
+    as output; handing it a source only means starting to copy bytes into its
+    stdin. ffmpeg decodes one input per process, so workers are single-use: a
+    used worker is killed when its chat moves on and the idle set is topped
+    back up in the background. ``acquire`` and ``release`` only send signals
+    and never wait on a process, since they run on the event loop; killed
+    workers are reaped and replacements spawned by the maintenance task, which
+    runs process startup off the loop. Idle workers that died or sat around
+    longer than ``max_idle`` seconds are replaced, and the total process count
+    (idle + busy) never exceeds ``max_procs``.
+    """
+
+    def __init__(self, ffmpeg: str = "ffmpeg", warm: int = 2, max_procs: Optional[int] = None,
+                 max_idle: float = 600.0, check_every: float = 5.0):
+        self.ffmpeg = ffmpeg
+        self.warm = warm
+        self.max_procs = max_procs or (os.cpu_count() or 1) * 8
+        self.max_idle = max_idle
+        self.check_every = check_every
+        self._idle: Deque[_Worker] = deque()
+        self._busy: Dict[int, _Worker] = {}
+        self._dying: List[_Worker] = []  # killed, not yet reaped
+        self._ids = itertools.count()
+        self._dir: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    def __len__(self):
+        return len(self._idle) + len(self._busy)
+
+    async def start(self):
+        self._dir = tempfile.mkdtemp(prefix="decoders-")
+        self._wake = asyncio.Event()
+        await self._top_up()
+        self._task = asyncio.ensure_future(self._maintain())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        while self._idle:
+            self._kill(self._idle.popleft())
+        for chat_id in list(self._busy):
+            self.release(chat_id)
+        dying, self._dying = self._dying, []
+        await asyncio.get_running_loop().run_in_executor(None, lambda: [self._wait(w) for w in dying])
+        if self._dir:
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+    def acquire(self, chat_id: int, source: str, headers: Optional[Dict[str, str]] = None) -> str:
+        """Start decoding ``source`` (URL or local path) for ``chat_id``; returns the PCM FIFO path.
+
+        ``headers`` go with a URL fetch (yt-dlp's ``http_headers``; googlevideo may refuse it without them).
+        """
+        self.release(chat_id)
+        worker = None
+        while self._idle:
+            w = self._idle.popleft()
+            if w.alive():
+                worker = w
+                break
+            self._kill(w)
+        if worker is None:
+            if len(self) >= self.max_procs:
+                raise DecoderBusy(f"all {self.max_procs} decoders are busy")
+            worker = self._spawn()
+        self._busy[chat_id] = worker
+        threading.Thread(target=self._feed, args=(worker, source, headers), daemon=True,
+                         name=f"decoder-feed-{chat_id}").start()
+        if self._wake is not None:
+            self._wake.set()  # refill the idle set off this call path
+        return worker.fifo
+
+    def release(self, chat_id: int):
+        w = self._busy.pop(chat_id, None)
+        if w is not None:
+            self._kill(w)
+
+    def stats(self) -> dict:
+        return {"idle": len(self._idle), "busy": len(self._busy), "max": self.max_procs}
+
+    # ------------- internals -------------
+    def _spawn(self) -> _Worker:
+        fifo = os.path.join(self._dir, f"dec-{next(self._ids)}.raw")
+        os.mkfifo(fifo)
+        proc = subprocess.Popen(
+            [self.ffmpeg, "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "s16le", "-ac", str(CHANNELS), "-ar", str(SAMPLE_RATE), "-y", fifo],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        return _Worker(proc, fifo)
+
+    def _kill(self, w: _Worker):
+        if w.alive():
+            w.proc.kill()
+        try: os.remove(w.fifo)
+        except OSError: pass
+        self._dying.append(w)
+
+    def _reap(self):
+        self._dying = [w for w in self._dying if w.proc.poll() is None]
+
+    @staticmethod
+    def _wait(w: _Worker):
+        try: w.proc.wait(timeout=1)
+        except subprocess.TimeoutExpired: pass
+
+    async def _top_up(self):
+        loop = asyncio.get_running_loop()
+        while len(self._idle) < self.warm and len(self) < self.max_procs:
+            self._idle.append(await loop.run_in_executor(None, self._spawn))
+
+    async def _maintain(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.check_every)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            now = time.monotonic()
+            for _ in range(len(self._idle)):
+                w = self._idle.popleft()
+                if w.alive() and now - w.spawned < self.max_idle:
+                    self._idle.append(w)
+                else:
+                    self._kill(w)
+            # reap workers whose chat never released them but whose ffmpeg has exited
+            for chat_id, w in list(self._busy.items()):
+                if not w.alive():
+                    self.release(chat_id)
+            self._reap()
+            try:
+                await self._top_up()
+            except OSError:
+                pass  # e.g. ffmpeg missing or out of fds; retried next round
+
+    @staticmethod
+    def _feed(worker: _Worker, source: str, headers: Optional[Dict[str, str]] = None):
+        try:
+            if "://" in source:
+                src = urllib.request.urlopen(urllib.request.Request(source, headers=headers or {}), timeout=30)
+            else:
+                src = open(source, "rb")
+            with src:
+                while True:
+                    chunk = src.read(64 * 1024)
+                    if not chunk:
+                        break
+                    worker.proc.stdin.write(chunk)
+        except (OSError, ValueError):
+            pass  # worker killed mid-track or source gone; ffmpeg sees EOF either way
+        finally:
+            try: worker.proc.stdin.close()
+            except OSError: pass
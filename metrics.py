@@ -0,0 +1,149 @@
+# metrics.py
+from __future__ import annotations
+import asyncio
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels(label: str, value: str) -> str:
+    return f'{{{label}="{value}"}}' if value else ""
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, label: str = "stage",
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series: Dict[str, List] = {}  # value -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: str, seconds: float):
+        s = self._series.get(value)
+        if s is None:
+            s = self._series[value] = [0] * (len(self.buckets) + 1) + [0.0]
+        s[bisect_left(self.buckets, seconds)] += 1
+        s[-1] += seconds
+
+    @contextmanager
+    def time(self, value: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(value, time.perf_counter() - t0)
+
+    def quantile(self, value: str, q: float) -> Optional[float]:
+        """Estimate from bucket boundaries (upper bound of the bucket holding the q-th sample)."""
+        s = self._series.get(value)
+        if not s:
+            return None
+        counts = s[:-1]
+        total = sum(counts)
+        if not total:
+            return None
+        rank, seen = q * total, 0
+        for i, c in enumerate(counts):
+            seen += c
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def series(self):
+        return self._series.keys()
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for value, s in sorted(self._series.items()):
+            cum = 0
+            for le, c in zip(self.buckets + ("+Inf",), s[:-1]):
+                cum += c
+                lbl = f'{self.label}="{value}",le="{le}"'
+                out.append(f"{self.name}_bucket{{{lbl}}} {cum}")
+            out.append(f"{self.name}_sum{_labels(self.label, value)} {s[-1]:.6f}")
+            out.append(f"{self.name}_count{_labels(self.label, value)} {cum}")
+        return out
+
+
+class Counter:
+    def __init__(self, name: str, help: str, label: str = "kind"):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._values: Dict[str, int] = {}
+
+    def inc(self, value: str = "", n: int = 1):
+        self._values[value] = self._values.get(value, 0) + n
+
+    def get(self, value: str = "") -> int:
+        return self._values.get(value, 0)
+
+    def snapshot(self) -> Dict[str, int]:
+        return dict(self._values)
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for value, n in sorted(self._values.items()):
+            out.append(f"{self.name}{_labels(self.label, value)} {n}")
+        return out
+
+
+class Gauge:
+    """Read at scrape time from ``fn``, which returns a number or a {label value: number} dict."""
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Union[float, Dict[str, float]]],
+                 label: str = "kind"):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.label = label
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        v = self.fn()
+        if isinstance(v, dict):
+            for k, n in sorted(v.items()):
+                out.append(f"{self.name}{_labels(self.label, k)} {n}")
+        else:
+            out.append(f"{self.name} {v}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+
+    def add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 9100):
+        """Minimal HTTP endpoint for Prometheus; every path returns the exposition text."""
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            try:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass  # request line and headers are ignored
+                body = self.render().encode()
+                writer.write(b"HTTP/1.1 200 OK\r\n"
+                             b"Content-Type: text/plain; version=0.0.4\r\n"
+                             b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                             b"Connection: close\r\n\r\n" + body)
+                await writer.drain()
+            finally:
+                writer.close()
+        return await asyncio.start_server(handle, host, port)
+
+
+REGISTRY = Registry()
+STAGES = REGISTRY.add(Histogram("musicbot_play_stage_seconds", "Latency of each /play pipeline stage"))
+ERRORS = REGISTRY.add(Counter("musicbot_errors_total", "Errors by kind"))
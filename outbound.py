@@ -0,0 +1,205 @@
+# outbound.py
+from __future__ import annotations
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, Hashable, Optional
+
+# Telegram's documented ceilings: ~30 messages/s overall, ~1/s into one chat (short bursts are tolerated)
+GLOBAL_RATE, GLOBAL_BURST = 30.0, 30.0
+CHAT_RATE, CHAT_BURST = 1.0, 3.0
+# bulk traffic (deletes, cleanup) only spends global tokens above this level,
+# so the rest are always left for interactive replies
+BULK_RESERVE = 0.3
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds Telegram asked us to wait, for pyrogram's FloodWait and telebot's 429 errors."""
+    if type(exc).__name__ == "FloodWait":
+        return float(getattr(exc, "value", None) or getattr(exc, "x", 0) or 0)
+    if getattr(exc, "error_code", None) == 429:
+        params = (getattr(exc, "result_json", None) or {}).get("parameters") or {}
+        return float(params.get("retry_after", 1))
+    return None
+
+
+class _Bucket:
+    __slots__ = ("rate", "burst", "tokens", "stamp", "blocked_until")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = now
+        self.blocked_until = 0.0
+
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+
+class Limiter:
+    """Global + per-chat token buckets and flood-wait blocks.
+
+    Thread-safe and never sleeps itself: ``reserve`` either takes the tokens
+    and returns 0, or returns how long the caller should wait before asking
+    again. Both the asyncio and the threaded front-ends share this logic.
+    """
+
+    def __init__(self, global_rate: float = GLOBAL_RATE, global_burst: float = GLOBAL_BURST,
+                 chat_rate: float = CHAT_RATE, chat_burst: float = CHAT_BURST,
+                 max_chats: int = 10_000):
+        now = time.monotonic()
+        self._lock = threading.Lock()
+        self._global = _Bucket(global_rate, global_burst, now)
+        self._chats: Dict[Hashable, _Bucket] = {}
+        self.chat_rate, self.chat_burst = chat_rate, chat_burst
+        self.max_chats = max_chats
+        self._latest: Dict[Hashable, int] = {}
+        self._gen = 0
+        self.sent = 0
+        self.flood_waits = 0
+        self.collapsed = 0
+
+    def reserve(self, chat_id: Optional[Hashable] = None, bulk: bool = False, paced: bool = True) -> float:
+        """``paced=False``: ``chat_id``'s bucket only holds its flood waits, it spends no tokens."""
+        now = time.monotonic()
+        with self._lock:
+            g = self._global
+            g.refill(now)
+            wait = g.blocked_until - now
+            floor = g.burst * BULK_RESERVE if bulk else 0.0
+            if g.tokens - floor < 1:
+                wait = max(wait, (1 + floor - g.tokens) / g.rate)
+            c = None
+            if chat_id is not None:
+                c = self._chats.get(chat_id)
+                if c is None:
+                    if len(self._chats) >= self.max_chats:
+                        self._prune(now)
+                    c = self._chats[chat_id] = _Bucket(self.chat_rate, self.chat_burst, now)
+                c.refill(now)
+                wait = max(wait, c.blocked_until - now)
+                if paced and c.tokens < 1:
+                    wait = max(wait, (1 - c.tokens) / c.rate)
+            if wait > 0:
+                return wait
+            g.tokens -= 1
+            if c is not None and paced:
+                c.tokens -= 1
+            self.sent += 1
+            return 0.0
+
+    def flood(self, chat_id: Optional[Hashable], seconds: float):
+        self.flood_waits += 1
+        until = time.monotonic() + seconds
+        with self._lock:
+            if chat_id is None:
+                b = self._global
+            else:
+                b = self._chats.get(chat_id)
+                if b is None:  # pruned meanwhile; the wait still only concerns this chat
+                    b = self._chats[chat_id] = _Bucket(self.chat_rate, self.chat_burst, time.monotonic())
+            b.blocked_until = max(b.blocked_until, until)
+
+    def supersede(self, key: Hashable) -> int:
+        """Register a new write for ``key`` (e.g. (chat_id, message_id)); older ones become stale."""
+        with self._lock:
+            self._gen += 1
+            self._latest[key] = self._gen
+            return self._gen
+
+    def is_current(self, key: Hashable, gen: int) -> bool:
+        with self._lock:
+            if self._latest.get(key) != gen:
+                self.collapsed += 1
+                return False
+            return True
+
+    def done(self, key: Hashable, gen: int):
+        with self._lock:
+            if self._latest.get(key) == gen:
+                del self._latest[key]
+
+    def _prune(self, now: float):
+        for k in [k for k, b in self._chats.items()
+                  if b.blocked_until < now and b.tokens + (now - b.stamp) * b.rate >= b.burst]:
+            del self._chats[k]
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "flood_waits": self.flood_waits, "collapsed": self.collapsed}
+
+
+class _Outbound:
+    def __init__(self, limiter: Optional[Limiter] = None, max_retries: int = 3, max_wait: float = 120.0):
+        self.limiter = limiter or Limiter()
+        self.max_retries = max_retries
+        self.max_wait = max_wait  # flood waits longer than this are raised to the caller
+
+    def _flooded(self, exc: BaseException, chat: Optional[Hashable], attempt: int) -> Optional[float]:
+        wait = retry_after(exc)
+        if wait is None or wait > self.max_wait or attempt >= self.max_retries:
+            return None
+        self.limiter.flood(chat, wait)
+        return wait
+
+
+class AsyncOutbound(_Outbound):
+    """Rate-limited sender for coroutine APIs (pyrogram, pytgcalls).
+
+    ``await out.call(message.reply_text, "hi", _chat=chat_id)``. Pass ``_bulk=True``
+    for traffic that may wait, and ``_collapse=key`` for writes where only the
+    latest one matters (menu edits); a superseded call returns None unsent.
+    ``_paced=False`` keeps ``_chat`` for flood waits only (moderation calls,
+    which Telegram doesn't count against a chat's message rate).
+    """
+
+    async def call(self, fn: Callable, *args, _chat: Optional[Hashable] = None, _bulk: bool = False,
+                   _collapse: Optional[Hashable] = None, _paced: bool = True, **kwargs):
+        gen = self.limiter.supersede(_collapse) if _collapse is not None else 0
+        attempt = 0
+        try:
+            while True:
+                # a newer write to the same target makes this one pointless; don't spend a token on it
+                if _collapse is not None and not self.limiter.is_current(_collapse, gen):
+                    return None
+                wait = self.limiter.reserve(_chat, _bulk, _paced)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception as e:
+                    if self._flooded(e, _chat, attempt) is None:
+                        raise
+                    attempt += 1
+        finally:
+            if _collapse is not None:
+                self.limiter.done(_collapse, gen)
+
+
+class SyncOutbound(_Outbound):
+    """Same as AsyncOutbound for blocking APIs (telebot); waits by sleeping the calling thread."""
+
+    def call(self, fn: Callable, *args, _chat: Optional[Hashable] = None, _bulk: bool = False,
+             _collapse: Optional[Hashable] = None, _paced: bool = True, **kwargs):
+        gen = self.limiter.supersede(_collapse) if _collapse is not None else 0
+        attempt = 0
+        try:
+            while True:
+                # a newer write to the same target makes this one pointless; don't spend a token on it
+                if _collapse is not None and not self.limiter.is_current(_collapse, gen):
+                    return None
+                wait = self.limiter.reserve(_chat, _bulk, _paced)
+                if wait > 0:
+                    time.sleep(wait)
+                    continue
+                try:
+                    return fn(*args, **kwargs)
+                except Exception as e:
+                    if self._flooded(e, _chat, attempt) is None:
+                        raise
+                    attempt += 1
+        finally:
+            if _collapse is not None:
+                self.limiter.done(_collapse, gen)
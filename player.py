@@ -0,0 +1,240 @@
+# player.py
+from __future__ import annotations
+import asyncio
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Union
+
+from audio_cache import AudioCache
+from metrics import STAGES, ERRORS
+from resolver import PlaylistFeed, Resolver, ResolveError
+from voice import VoiceSessions
+
+
+class Track:
+    __slots__ = ("query", "info", "prefetch")
+
+    def __init__(self, query: str, info: Optional[dict] = None):
+        self.query = query
+        self.info = info
+        self.prefetch: Optional[asyncio.Task] = None
+
+    @property
+    def title(self) -> str:
+        return (self.info or {}).get("title") or self.query
+
+
+class PlaylistItem:
+    """A queue slot that expands into the playlist's tracks one at a time as the queue reaches it."""
+    __slots__ = ("feed", "ahead", "pulling")
+
+    def __init__(self, feed: PlaylistFeed):
+        self.feed = feed
+        self.ahead: Optional[Track] = None  # next entry, already pulled and being resolved
+        self.pulling: Optional[asyncio.Task] = None
+
+
+class ChatQueue:
+    def __init__(self):
+        self.current: Optional[Track] = None
+        self.pending: Deque[Union[Track, PlaylistItem]] = deque()
+        self.lock = asyncio.Lock()
+
+
+class Player:
+    """Per-chat playback queues on top of PyTgCalls.
+
+    While a track is playing, the next one is resolved in the background so
+    that the switch on stream end is a single stream swap on the joined call.
+    """
+
+    def __init__(self, voice: VoiceSessions, resolver: Resolver,
+                 make_stream: Callable[[int, str, Optional[dict]], object], cache: Optional[AudioCache] = None):
+        self.voice = voice
+        self.resolver = resolver
+        self.make_stream = make_stream
+        self.cache = cache
+        self._queues: Dict[int, ChatQueue] = {}
+
+    def _queue(self, chat_id: int) -> ChatQueue:
+        q = self._queues.get(chat_id)
+        if q is None:
+            q = self._queues[chat_id] = ChatQueue()
+        return q
+
+    def queue_of(self, chat_id: int) -> Optional[ChatQueue]:
+        return self._queues.get(chat_id)
+
+    def queued(self) -> int:
+        return sum(len(q.pending) for q in self._queues.values())
+
+    async def enqueue(self, chat_id: int, query: str) -> int:
+        """Queue ``query``; returns 0 if it started playing, else its position in the queue."""
+        while True:
+            q = self._queue(chat_id)
+            async with q.lock:
+                if self._queues.get(chat_id) is not q:
+                    continue  # it ran empty and was dropped while we waited; start a fresh one
+                if q.current is None:
+                    with STAGES.time("resolve"):
+                        track = Track(query, await self.resolver.resolve(query))
+                    try:
+                        with STAGES.time("join"):
+                            await self.voice.play(chat_id, self._stream(chat_id, track))
+                    except BaseException:
+                        self._queues.pop(chat_id, None)  # nothing is playing; the next /play starts over
+                        raise
+                    q.current = track
+                    self._prefetch(q)
+                    return 0
+                q.pending.append(Track(query))
+                self._prefetch(q)
+                return len(q.pending)
+
+    async def enqueue_playlist(self, chat_id: int, url: str) -> int:
+        """Queue a playlist: its first entry is queued like a normal track, the rest lazily."""
+        feed = await self.resolver.playlist(url)
+        first = await feed.next()
+        if first is None:
+            raise ResolveError("that playlist is empty")
+        pos = await self.enqueue(chat_id, first)
+        q = self._queue(chat_id)
+        async with q.lock:
+            q.pending.append(PlaylistItem(feed))
+            if q.current is None:
+                await self._advance(chat_id, q)  # the first entry already finished (or a fresh queue)
+            else:
+                self._prefetch(q)
+        return pos
+
+    async def skip(self, chat_id: int) -> Optional[Track]:
+        q = self._queues.get(chat_id)
+        if q is None or q.current is None:
+            return None
+        async with q.lock:
+            return await self._advance(chat_id, q, silence=True)
+
+    async def stop(self, chat_id: int):
+        q = self._queues.get(chat_id)
+        if q is not None:
+            # waits for an in-flight first /play, so it can't start playing after we stopped
+            async with q.lock:
+                if self._queues.get(chat_id) is q:
+                    del self._queues[chat_id]
+                self._cancel(q)
+        await self.voice.release(chat_id, silence=True)
+
+    def drop(self, chat_id: int):
+        """Forget a chat's queue after its call ended outside our control (kicked, closed, left)."""
+        q = self._queues.pop(chat_id, None)
+        if q is not None:
+            q.current = None
+            self._cancel(q)
+
+    async def restart(self, chat_id: int):
+        """Start the current track again, e.g. after its assistant dropped the call."""
+        q = self._queues.get(chat_id)
+        if q is None or q.current is None:
+            return
+        async with q.lock:
+            await self.voice.play(chat_id, self._stream(chat_id, q.current))
+
+    async def on_stream_end(self, chat_id: int):
+        q = self._queues.get(chat_id)
+        if q is None:
+            return
+        async with q.lock:
+            await self._advance(chat_id, q)
+
+    # ------------- internals -------------
+    @staticmethod
+    def _cancel(q: ChatQueue):
+        for t in q.pending:
+            if isinstance(t, PlaylistItem):
+                if t.pulling is not None:
+                    t.pulling.cancel()
+                t = t.ahead
+            if t is not None and t.prefetch is not None:
+                t.prefetch.cancel()
+        q.pending.clear()
+
+    def _stream(self, chat_id: int, track: Track):
+        local = self.cache.lookup(track.info) if self.cache is not None else None
+        if local:
+            return self.make_stream(chat_id, local, None)
+        return self.make_stream(chat_id, track.info["url"], track.info.get("http_headers"))
+
+    def _prefetch(self, q: ChatQueue):
+        if not q.pending:
+            return
+        nxt = q.pending[0]
+        if isinstance(nxt, PlaylistItem):
+            if nxt.ahead is None and nxt.pulling is None:
+                nxt.pulling = asyncio.ensure_future(self._pull(nxt))
+            return
+        self._prefetch_track(nxt)
+
+    def _prefetch_track(self, track: Track):
+        if track.info is None and track.prefetch is None:
+            track.prefetch = asyncio.ensure_future(self.resolver.resolve(track.query))
+            # failures are handled when the track is reached
+            track.prefetch.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    async def _pull(self, item: PlaylistItem):
+        url = await item.feed.next()
+        if url is not None:
+            item.ahead = Track(url)
+            self._prefetch_track(item.ahead)
+
+    async def _take(self, item: PlaylistItem) -> Optional[Track]:
+        """Next track out of a playlist slot, or None once the playlist is used up."""
+        if item.pulling is not None:
+            pulling, item.pulling = item.pulling, None
+            if not pulling.cancelled():
+                await pulling
+        if item.ahead is None:
+            await self._pull(item)
+        track, item.ahead = item.ahead, None
+        return track
+
+    async def _ready(self, track: Track) -> bool:
+        if track.info is not None:
+            return True
+        try:
+            if track.prefetch is not None and not track.prefetch.cancelled():
+                track.info = await track.prefetch
+            else:
+                track.info = await self.resolver.resolve(track.query)
+        except ResolveError:
+            ERRORS.inc("prefetch")
+            return False
+        return True
+
+    async def _advance(self, chat_id: int, q: ChatQueue, silence: bool = False) -> Optional[Track]:
+        """Play the next playable track; ``silence`` pauses the old one if none is left (/skip)."""
+        while q.pending:
+            head = q.pending[0]
+            if isinstance(head, PlaylistItem):
+                track = await self._take(head)
+                if track is None:
+                    q.pending.popleft()
+                    continue
+            else:
+                track = q.pending.popleft()
+            if not await self._ready(track):
+                continue  # unplayable, try the one after it
+            try:
+                with STAGES.time("switch"):
+                    await self.voice.play(chat_id, self._stream(chat_id, track))
+            except Exception:
+                # join / stream swap failed or no free decoder: end the queue cleanly instead of
+                # leaving q.current on a finished track, which would make every /play just queue
+                ERRORS.inc("switch")
+                self._cancel(q)
+                break
+            q.current = track
+            self._prefetch(q)
+            return track
+        q.current = None
+        self._queues.pop(chat_id, None)
+        await self.voice.release(chat_id, silence=silence)
+        return None
@@ -0,0 +1,232 @@
+# resolver.py
+from __future__ import annotations
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
+from urllib.parse import urlparse, parse_qs
+
+# yt_dlp takes a noticeable chunk of startup to import; it is loaded on first use
+# (or by Resolver.warm() in the background) instead
+YoutubeDL = None
+
+
+def _ydl_class():
+    global YoutubeDL
+    if YoutubeDL is None:
+        from yt_dlp import YoutubeDL as cls
+        YoutubeDL = cls
+    return YoutubeDL
+
+
+class ResolveError(Exception):
+    pass
+
+
+# ------------- Resolved-URL cache -------------
+_YT_ID = re.compile(r"(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/|live/)|youtu\.be/)([\w-]{11})")
+_KEEP = ("id", "extractor_key", "title", "duration", "url", "webpage_url", "http_headers")
+
+
+_URL = re.compile(r"^[a-z][a-z0-9+.-]*://\S+$", re.I)
+
+
+def cache_key(query: str) -> str:
+    m = _YT_ID.search(query)
+    if m:
+        return "yt:" + m.group(1)
+    q = query.strip()
+    if _URL.match(q):
+        return "u:" + q  # paths and query strings are case-sensitive
+    return "q:" + " ".join(q.lower().split())
+
+
+def _url_expiry(url: str) -> Optional[float]:
+    try:
+        return float(parse_qs(urlparse(url).query)["expire"][0])
+    except (KeyError, IndexError, ValueError):
+        return None
+
+
+class ResolvedCache:
+    """LRU cache of resolved stream info; entries live until the googlevideo ``expire=`` time."""
+
+    def __init__(self, maxsize: int = 1024, default_ttl: float = 1800.0, margin: float = 60.0):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self.margin = margin  # stop handing out a URL this many seconds before it dies
+        self._data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        item = self._data.get(key)
+        if item is not None:
+            deadline, info = item
+            if deadline > time.time():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return info
+            del self._data[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: str, info: dict):
+        expire = _url_expiry(info["url"])
+        deadline = (expire if expire else time.time() + self.default_ttl) - self.margin
+        if deadline <= time.time():
+            return
+        self._data[key] = (deadline, info)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+# ------------- Playlists -------------
+def is_playlist(query: str) -> bool:
+    u = urlparse(query.strip())
+    return u.path.rstrip("/") == "/playlist" and "list" in parse_qs(u.query)
+
+
+class PlaylistFeed:
+    """Hands out a playlist's entry URLs one at a time.
+
+    Backed by yt-dlp's flat, lazily paged entry generator, so only the page
+    currently being read is held in memory however long the playlist is.
+    """
+
+    def __init__(self, resolver: "Resolver", entries: Iterator[dict], title: Optional[str]):
+        self._resolver = resolver
+        self._entries: Optional[Iterator[dict]] = entries
+        self.title = title
+        self.taken = 0
+
+    def _step(self) -> Optional[str]:
+        for e in self._entries:
+            if not e:
+                continue
+            url = e.get("url") or e.get("id")
+            if url:
+                return url
+        return None
+
+    async def next(self) -> Optional[str]:
+        if self._entries is None:
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            url = await asyncio.wait_for(loop.run_in_executor(self._resolver._pool, self._step),
+                                         self._resolver.timeout)
+        except Exception:
+            url = None  # a half-consumed generator can't be resumed safely, give up on the rest
+        if url is None:
+            self._entries = None
+            return None
+        self.taken += 1
+        return url
+
+
+class Resolver:
+    """Runs yt-dlp extraction in a bounded thread pool so the event loop never blocks.
+
+    At most ``max_concurrent`` extractions run at once; callers beyond that wait
+    on a semaphore, and every call is bounded by ``timeout`` seconds.
+    """
+
+    def __init__(self, ydl_opts: dict, max_workers: int = 4,
+                 max_concurrent: Optional[int] = None, timeout: float = 20.0,
+                 cache: Optional[ResolvedCache] = None):
+        self._opts = dict(ydl_opts)
+        # make the worker thread give up on its own instead of lingering past the timeout
+        self._opts.setdefault("socket_timeout", timeout)
+        # a watch URL carrying &list= means that one video; whole playlists go through playlist()
+        self._opts.setdefault("noplaylist", True)
+        self._flat_opts = dict(self._opts, extract_flat="in_playlist", lazy_playlist=True, noplaylist=False)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resolver")
+        self._max_concurrent = max_concurrent or max_workers
+        self._sem: Optional[asyncio.Semaphore] = None
+        self.timeout = timeout
+        self.cache = cache if cache is not None else ResolvedCache()
+        self._inflight: dict = {}
+        self.coalesced = 0
+
+    def _extract(self, query: str) -> Optional[dict]:
+        with _ydl_class()(self._opts) as ydl:
+            return ydl.extract_info(query, download=False)
+
+    async def resolve(self, query: str, timeout: Optional[float] = None) -> dict:
+        key = cache_key(query)
+        info = self.cache.get(key)
+        if info is not None:
+            return info
+        # single-flight: identical queries already being resolved share one extraction
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(self._resolve_and_store(key, query, timeout))
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda f: self._done(key, f))
+        else:
+            self.coalesced += 1
+        # shield so one impatient caller can't cancel the lookup for everyone else
+        return await asyncio.shield(fut)
+
+    def _done(self, key: str, fut: asyncio.Future):
+        self._inflight.pop(key, None)
+        if not fut.cancelled():
+            fut.exception()  # mark retrieved even if every waiter went away
+
+    async def _resolve_and_store(self, key: str, query: str, timeout: Optional[float]) -> dict:
+        info = await self._resolve(query, timeout)
+        self.cache.put(key, info)
+        # a search hit is also reachable by its video id
+        if info.get("extractor_key") == "Youtube" and not key.startswith("yt:"):
+            self.cache.put("yt:" + info["id"], info)
+        return info
+
+    async def _resolve(self, query: str, timeout: Optional[float]) -> dict:
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self._max_concurrent)
+        loop = asyncio.get_running_loop()
+        async with self._sem:
+            fut = loop.run_in_executor(self._pool, self._extract, query)
+            try:
+                info = await asyncio.wait_for(fut, timeout or self.timeout)
+            except asyncio.TimeoutError:
+                raise ResolveError(f"timed out resolving {query!r}") from None
+        # search queries ("default_search": "auto") come back as a playlist of results
+        if info and info.get("entries") is not None:
+            info = next((e for e in info["entries"] if e), None)
+        if not info or not info.get("url"):
+            raise ResolveError(f"nothing found for {query!r}")
+        return {k: info[k] for k in _KEEP if k in info}
+
+    def _open_playlist(self, url: str) -> Optional[dict]:
+        # no "with": the lazy entries generator keeps using this YoutubeDL after we return
+        return _ydl_class()(self._flat_opts).extract_info(url, download=False, process=False)
+
+    async def playlist(self, url: str) -> PlaylistFeed:
+        loop = asyncio.get_running_loop()
+        try:
+            info = await asyncio.wait_for(loop.run_in_executor(self._pool, self._open_playlist, url),
+                                          self.timeout)
+        except asyncio.TimeoutError:
+            raise ResolveError(f"timed out opening playlist {url!r}") from None
+        if not info or info.get("entries") is None:
+            raise ResolveError(f"not a playlist: {url!r}")
+        return PlaylistFeed(self, iter(info["entries"]), info.get("title"))
+
+    def _warm(self):
+        with _ydl_class()(self._opts) as ydl:
+            ydl.get_info_extractor("Youtube")
+
+    def warm(self):
+        """Import yt-dlp and load the YouTube extractor on a pool thread, ahead of the first /play."""
+        self._pool.submit(self._warm)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,113 @@
+# voice.py
+from __future__ import annotations
+import asyncio
+from typing import Callable, Dict, Optional
+
+
+class VoiceSession:
+    __slots__ = ("chat_id", "paused", "idle_timer")
+
+    def __init__(self, chat_id: int):
+        self.chat_id = chat_id
+        self.paused = False
+        self.idle_timer: Optional[asyncio.TimerHandle] = None
+
+
+class VoiceSessions:
+    """Keeps group calls joined between tracks.
+
+    Joining and leaving are the most expensive, flood-limited calls we make, so a
+    joined chat only has its stream swapped; it is left after ``idle_timeout``
+    seconds without anything to play.
+    """
+
+    def __init__(self, calls, idle_timeout: float = 180.0,
+                 on_leave: Optional[Callable[[int], None]] = None, outbound=None):
+        self.calls = calls
+        self.outbound = outbound  # AsyncOutbound: join/leave/switch honour flood waits
+        self.idle_timeout = idle_timeout
+        self.on_leave = on_leave  # called once a chat's call is gone, for releasing per-chat resources
+        self._sessions: Dict[int, VoiceSession] = {}
+
+    def is_joined(self, chat_id: int) -> bool:
+        return chat_id in self._sessions
+
+    def __len__(self):
+        return len(self._sessions)
+
+    async def play(self, chat_id: int, stream):
+        s = self._sessions.get(chat_id)
+        if s is not None:
+            self._cancel_idle(s)
+            try:
+                await self._call(self.calls.change_stream, chat_id, stream)
+                if s.paused:
+                    await self._call(self.calls.resume_stream, chat_id)
+                    s.paused = False
+                return
+            except Exception:
+                # the call went away under us (kicked / voice chat closed); join again
+                self._sessions.pop(chat_id, None)
+        try:
+            await self._call(self.calls.join_group_call, chat_id, stream)
+        except Exception:
+            if self.on_leave is not None:
+                self.on_leave(chat_id)
+            raise
+        self._sessions[chat_id] = VoiceSession(chat_id)
+
+    async def release(self, chat_id: int, silence: bool = False):
+        """Nothing left to play: stay joined for a while, then leave.
+
+        ``silence`` pauses the current stream first (for an explicit /stop).
+        """
+        s = self._sessions.get(chat_id)
+        if s is None:
+            return
+        if silence and not s.paused:
+            await self._call(self.calls.pause_stream, chat_id)
+            s.paused = True
+        self._cancel_idle(s)
+        loop = asyncio.get_running_loop()
+        s.idle_timer = loop.call_later(self.idle_timeout,
+                                       lambda: asyncio.ensure_future(self._idle_leave(chat_id)))
+
+    async def leave(self, chat_id: int):
+        s = self._sessions.pop(chat_id, None)
+        if s is None:
+            return
+        self._cancel_idle(s)
+        try:
+            await self._call(self.calls.leave_group_call, chat_id)
+        finally:
+            if self.on_leave is not None:
+                self.on_leave(chat_id)
+
+    def forget(self, chat_id: int):
+        """Drop state for a call that ended outside our control (kicked, closed, left)."""
+        s = self._sessions.pop(chat_id, None)
+        if s is not None:
+            self._cancel_idle(s)
+            if self.on_leave is not None:
+                self.on_leave(chat_id)
+
+    async def _idle_leave(self, chat_id: int):
+        s = self._sessions.get(chat_id)
+        if s is None or s.idle_timer is None:
+            return
+        s.idle_timer = None
+        try:
+            await self.leave(chat_id)
+        except Exception:
+            self.forget(chat_id)
+
+    async def _call(self, fn, chat_id: int, *args):
+        if self.outbound is None:
+            return await fn(chat_id, *args)
+        return await self.outbound.call(fn, chat_id, *args, _chat=("call", chat_id))
+
+    @staticmethod
+    def _cancel_idle(s: VoiceSession):
+        if s.idle_timer is not None:
+            s.idle_timer.cancel()
+            s.idle_timer = None